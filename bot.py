@@ -11,9 +11,9 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
-import aiosqlite
 import logging
 import os
+import time
 from datetime import datetime
 from pathlib import Path
 
@@ -21,6 +21,7 @@ from pathlib import Path
 try:
     import config
     from database import db_manager
+    from modules.guild_settings import guild_settings_cache
     from economy import EconomySystem
     from keep_alive import keep_alive
 except ImportError as e:
@@ -49,21 +50,7 @@ DB_ENABLED = False
 @bot.event
 async def on_ready():
     """ボット起動時の処理"""
-    global DB_ENABLED
-    
     bot_logger.info("ボット開始")
-    
-    # データベース初期化
-    try:
-        await db_manager.initialize()
-        DB_ENABLED = db_manager.is_initialized()
-        if DB_ENABLED:
-            bot_logger.info("データベースシステム初期化完了")
-        else:
-            bot_logger.warning("データベースが利用できません")
-    except Exception as e:
-        bot_logger.error(f"データベース初期化エラー: {e}")
-        DB_ENABLED = False
 
     # Keep-alive サーバー起動
     try:
@@ -103,6 +90,22 @@ async def on_ready():
 
     print("🚀 ボットが完全に準備完了しました！")
 
+async def init_database():
+    """データベースとギルド設定キャッシュを初期化（メッセージハンドラー登録前に呼ぶ）"""
+    global DB_ENABLED
+    
+    try:
+        await db_manager.initialize()
+        DB_ENABLED = db_manager.is_initialized()
+        if DB_ENABLED:
+            await guild_settings_cache.load()
+            bot_logger.info("データベースシステム初期化完了")
+        else:
+            bot_logger.warning("データベースが利用できません")
+    except Exception as e:
+        bot_logger.error(f"データベース初期化エラー: {e}")
+        DB_ENABLED = False
+
 async def load_modules():
     """全モジュールを読み込み"""
     modules = [
@@ -136,6 +139,88 @@ async def load_modules():
         for module, error in failed_modules:
             print(f"  - {module}: {error}")
 
+# ===== メッセージルーター =====
+class MessageRouter:
+    """メッセージイベントの一元ルーター
+
+    ギルド設定をメッセージごとに1回だけキャッシュから解決し、
+    そのチャンネルで有効な機能のハンドラーにのみ配送する。
+    """
+
+    def __init__(self):
+        self.handlers = []
+        self.stats = {}
+
+    def register(self, name: str, predicate, handler):
+        """ハンドラーを登録（predicate(message, settings) が真のときに handler(message, settings) を実行）"""
+        self.handlers.append((name, predicate, handler))
+        self.stats[name] = {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0}
+
+    async def dispatch(self, message: discord.Message):
+        """メッセージを有効なハンドラーへ配送"""
+        if message.author.bot or message.guild is None or not self.handlers:
+            return
+        if not db_manager.is_initialized():
+            return
+
+        settings = await guild_settings_cache.get(message.guild.id)
+        targets = [
+            (name, handler) for name, predicate, handler in self.handlers
+            if predicate(message, settings)
+        ]
+        if targets:
+            await asyncio.gather(*(
+                self._run(name, handler, message, settings) for name, handler in targets
+            ))
+
+    async def _run(self, name: str, handler, message: discord.Message, settings: dict):
+        """ハンドラーを実行して処理時間を記録"""
+        start = time.perf_counter()
+        try:
+            await handler(message, settings)
+        except Exception as e:
+            self.stats[name]['errors'] += 1
+            bot_logger.error(f"メッセージハンドラーエラー ({name}): {e}")
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            stats = self.stats[name]
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+
+    def get_stats(self) -> dict:
+        """ハンドラーごとの実行統計を取得"""
+        return {
+            name: {
+                'calls': stats['calls'],
+                'errors': stats['errors'],
+                'avg_ms': stats['total_ms'] / stats['calls'] if stats['calls'] else 0.0,
+                'max_ms': stats['max_ms'],
+            }
+            for name, stats in self.stats.items()
+        }
+
+message_router = MessageRouter()
+
+def register_message_handlers():
+    """読み込み済みのCogからメッセージハンドラーを登録"""
+    channel_cog = bot.get_cog('ChannelManagementCog')
+    if channel_cog:
+        message_router.register('chinese_channel', channel_cog.is_chinese_channel, channel_cog._handle_chinese_channel)
+        message_router.register('global_chat', channel_cog.is_global_chat, channel_cog._handle_global_chat)
+
+    voice_cog = bot.get_cog('VoiceCog')
+    if voice_cog:
+        message_router.register('auto_read', voice_cog.is_auto_read_channel, voice_cog._handle_auto_read)
+
+    bot_logger.info(f"メッセージハンドラー登録完了: {', '.join(message_router.stats) or 'なし'}")
+
+@bot.event
+async def on_message(message):
+    """メッセージイベント処理"""
+    await message_router.dispatch(message)
+    await bot.process_commands(message)
+
 # ===== 経済システムコマンド =====
 economy_system = EconomySystem()
 
@@ -283,44 +368,23 @@ async def pc_shop(interaction: discord.Interaction, part_type: str, quantity: in
     try:
         from modules.pc_parts import PCPartsData
         
-        # 基本価格設定
-        base_prices = {
-            "gpus": 100000,
-            "cpus": 80000,
-            "motherboards": 50000,
-            "psus": 30000
-        }
-        
-        total_cost = base_prices[part_type] * quantity
+        # 抽選・支払い・インベントリ追加を1トランザクションで行う
+        success, result = await economy_system.purchase_parts(
+            interaction.guild.id, interaction.user.id, part_type, quantity
+        )
         
-        # 残高確認
-        balance = await economy_system.get_user_balance(interaction.guild.id, interaction.user.id)
-        if balance < total_cost:
-            embed = discord.Embed(
-                title="💸 残高不足",
-                description=f"必要: {total_cost:,} {economy_system.currency_symbol}\n現在: {balance:,} {economy_system.currency_symbol}",
-                color=0xff0000
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
+        if not success:
+            if isinstance(result, dict):
+                embed = discord.Embed(
+                    title="💸 残高不足",
+                    description=f"必要: {result['total_cost']:,} {economy_system.currency_symbol}\n現在: {result['balance']:,} {economy_system.currency_symbol}",
+                    color=0xff0000
+                )
+                await interaction.response.send_message(embed=embed, ephemeral=True)
+            else:
+                await interaction.response.send_message("❌ PCパーツ購入中にエラーが発生しました。", ephemeral=True)
             return
         
-        # パーツを抽選
-        acquired_parts = []
-        for _ in range(quantity):
-            part_name, part_data = PCPartsData.get_random_part(part_type)
-            acquired_parts.append((part_name, part_data))
-            
-            # インベントリに追加
-            await economy_system.add_part_to_inventory(
-                interaction.guild.id, interaction.user.id, part_type, part_name, part_data
-            )
-        
-        # 支払い処理
-        await economy_system.update_balance(
-            interaction.guild.id, interaction.user.id, -total_cost, "purchase", 
-            f"PCパーツ購入 ({part_type})"
-        )
-        
         # 結果表示
         embed = discord.Embed(
             title="🛒 PCパーツ購入完了",
@@ -331,19 +395,18 @@ async def pc_shop(interaction: discord.Interaction, part_type: str, quantity: in
         
         embed.add_field(
             name="💰 支払い",
-            value=f"{total_cost:,} {economy_system.currency_symbol}",
+            value=f"{result['total_cost']:,} {economy_system.currency_symbol}",
             inline=True
         )
         
-        new_balance = balance - total_cost
         embed.add_field(
             name="💳 残高",
-            value=f"{new_balance:,} {economy_system.currency_symbol}",
+            value=f"{result['new_balance']:,} {economy_system.currency_symbol}",
             inline=True
         )
         
         # 獲得パーツ詳細
-        for i, (part_name, part_data) in enumerate(acquired_parts):
+        for i, (part_name, part_data) in enumerate(result['parts']):
             tier = part_data["tier"]
             rarity_emoji = PCPartsData.RARITY_EMOJIS[tier]
             
@@ -426,22 +489,20 @@ async def pc_build(interaction: discord.Interaction):
                     embed.add_field(name="⚡ 電源", value=f"{tier_emoji} {psu_name}", inline=True)
             
             # 性能統計
-            total_hash_rate = PCPartsData.calculate_total_hash_rate(pc_build)
-            total_power = PCPartsData.calculate_power_consumption(pc_build)
-            efficiency = total_hash_rate / max(total_power, 1) if total_power > 0 else 0
+            compiled = PCPartsData.compile_build(pc_build)
+            efficiency = compiled.efficiency if compiled.power > 0 else 0
             
             embed.add_field(
                 name="📊 性能統計",
-                value=f"**ハッシュレート**: {total_hash_rate} MH/s\n**消費電力**: {total_power}W\n**効率**: {efficiency:.2f}",
+                value=f"**ハッシュレート**: {compiled.hash_rate} MH/s\n**消費電力**: {compiled.power}W\n**効率**: {efficiency:.2f}",
                 inline=False
             )
             
             # 構成チェック
-            is_valid, message = PCPartsData.is_build_valid(pc_build)
-            if not is_valid:
+            if not compiled.is_valid:
                 embed.add_field(
                     name="⚠️ 構成の問題",
-                    value=message,
+                    value=compiled.message,
                     inline=False
                 )
         
@@ -460,20 +521,9 @@ async def pc_inventory(interaction: discord.Interaction):
     
     try:
         from modules.pc_parts import PCPartsData
-        import json
         
         # インベントリ取得
-        async with aiosqlite.connect(db_manager.db_path) as db:
-            cursor = await db.execute('''
-                SELECT inventory FROM user_economy 
-                WHERE guild_id = ? AND user_id = ?
-            ''', (interaction.guild.id, interaction.user.id))
-            result = await cursor.fetchone()
-        
-        if result and result[0]:
-            inventory = json.loads(result[0])
-        else:
-            inventory = {}
+        inventory = await economy_system.get_inventory(interaction.guild.id, interaction.user.id)
         
         embed = discord.Embed(
             title="🎒 PCパーツインベントリ",
@@ -538,20 +588,9 @@ async def pc_assemble(interaction: discord.Interaction, gpu: str = None, cpu: st
     
     try:
         from modules.pc_parts import PCPartsData
-        import json
         
         # インベントリ取得
-        async with aiosqlite.connect(db_manager.db_path) as db:
-            cursor = await db.execute('''
-                SELECT inventory FROM user_economy 
-                WHERE guild_id = ? AND user_id = ?
-            ''', (interaction.guild.id, interaction.user.id))
-            result = await cursor.fetchone()
-        
-        if result and result[0]:
-            inventory = json.loads(result[0])
-        else:
-            inventory = {}
+        inventory = await economy_system.get_inventory(interaction.guild.id, interaction.user.id)
         
         new_build = {}
         errors = []
@@ -617,11 +656,11 @@ async def pc_assemble(interaction: discord.Interaction, gpu: str = None, cpu: st
             return
         
         # 構成の有効性チェック
-        is_valid, message = PCPartsData.is_build_valid(new_build)
-        if not is_valid:
+        compiled = PCPartsData.compile_build(new_build)
+        if not compiled.is_valid:
             embed = discord.Embed(
                 title="❌ 構成エラー",
-                description=message,
+                description=compiled.message,
                 color=0xff0000
             )
             await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -632,9 +671,9 @@ async def pc_assemble(interaction: discord.Interaction, gpu: str = None, cpu: st
         
         if success:
             # 性能計算
-            total_hash_rate = PCPartsData.calculate_total_hash_rate(new_build)
-            total_power = PCPartsData.calculate_power_consumption(new_build)
-            efficiency = total_hash_rate / max(total_power, 1) if total_power > 0 else 0
+            total_hash_rate = compiled.hash_rate
+            total_power = compiled.power
+            efficiency = compiled.efficiency if total_power > 0 else 0
             
             embed = discord.Embed(
                 title="🔧 PC組み立て完了",
@@ -777,6 +816,94 @@ async def leaderboard(interaction: discord.Interaction):
         bot_logger.error(f"ランキング表示エラー: {e}")
         await interaction.response.send_message("❌ ランキング表示中にエラーが発生しました。", ephemeral=True)
 
+# ===== 管理コマンド =====
+@bot.tree.command(name="dbstats", description="データベース接続プールの統計を表示します（管理者限定）")
+async def dbstats(interaction: discord.Interaction):
+    """データベース接続プール統計コマンド"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ このコマンドは管理者のみが使用できます。", ephemeral=True)
+        return
+    
+    stats = db_manager.get_pool_stats()
+    
+    embed = discord.Embed(
+        title="🗃️ データベース接続プール",
+        color=0x0099ff if stats['initialized'] else 0xff0000,
+        timestamp=datetime.now()
+    )
+    embed.add_field(name="状態", value="✅ 接続中" if stats['initialized'] else "❌ 未接続", inline=True)
+    embed.add_field(name="読み取り接続数", value=f"{stats['pool_size']}", inline=True)
+    embed.add_field(name="ジャーナルモード", value=stats['journal_mode'], inline=True)
+    
+    for key, label in (('reader', "📖 読み取り"), ('writer', "✏️ 書き込み")):
+        pool = stats[key]
+        embed.add_field(
+            name=label,
+            value=(
+                f"**使用中**: {pool['in_use']}\n"
+                f"**チェックアウト数**: {pool['checkouts']:,}\n"
+                f"**秒間チェックアウト**: {pool['checkouts_per_sec']:.2f}/s\n"
+                f"**平均待ち時間**: {pool['avg_wait_ms']:.2f}ms\n"
+                f"**最大待ち時間**: {pool['max_wait_ms']:.2f}ms"
+            ),
+            inline=False
+        )
+    
+    write_queue = stats['write_queue']
+    embed.add_field(
+        name="📦 書き込みキュー",
+        value=(
+            f"**待機中**: {write_queue['depth']}\n"
+            f"**コミット回数**: {write_queue['batches']:,}\n"
+            f"**平均バッチサイズ**: {write_queue['avg_batch_size']:.2f}"
+        ),
+        inline=False
+    )
+    
+    cache_stats = guild_settings_cache.get_stats()
+    embed.add_field(
+        name="⚙️ ギルド設定キャッシュ",
+        value=(
+            f"**読み込み済み**: {'はい' if cache_stats['loaded'] else 'いいえ'}\n"
+            f"**ギルド数**: {cache_stats['guilds']:,}\n"
+            f"**ヒット/ミス**: {cache_stats['hits']:,} / {cache_stats['misses']:,}\n"
+            f"**ヒット率**: {cache_stats['hit_rate']:.2f}%"
+        ),
+        inline=False
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="handlerstats", description="メッセージハンドラーの処理時間を表示します（管理者限定）")
+async def handlerstats(interaction: discord.Interaction):
+    """メッセージハンドラー統計コマンド"""
+    if not interaction.user.guild_permissions.administrator:
+        await interaction.response.send_message("❌ このコマンドは管理者のみが使用できます。", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="📨 メッセージハンドラー統計",
+        color=0x0099ff,
+        timestamp=datetime.now()
+    )
+    
+    for name, stats in message_router.get_stats().items():
+        embed.add_field(
+            name=name,
+            value=(
+                f"**実行回数**: {stats['calls']:,}\n"
+                f"**エラー数**: {stats['errors']:,}\n"
+                f"**平均処理時間**: {stats['avg_ms']:.2f}ms\n"
+                f"**最大処理時間**: {stats['max_ms']:.2f}ms"
+            ),
+            inline=True
+        )
+    
+    if not embed.fields:
+        embed.description = "登録されているハンドラーはありません。"
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # ===== ダイスヘルプコマンド =====
 @bot.tree.command(name="dicehelp", description="えせ中国語ダイス機能の使い方を表示します")
 async def dicehelp(interaction: discord.Interaction):
@@ -813,8 +940,12 @@ async def dicehelp(interaction: discord.Interaction):
 async def main():
     """メイン実行関数"""
     try:
+        # ギルド設定を読み込んでからメッセージハンドラーを登録する
+        await init_database()
+        
         # モジュール読み込み
         await load_modules()
+        register_message_handlers()
         
         # Botトークン確認
         if not hasattr(config, 'DISCORD_TOKEN') or not config.DISCORD_TOKEN:
@@ -830,6 +961,18 @@ async def main():
     except Exception as e:
         print(f"❌ ボット起動エラー: {e}")
         bot_logger.error(f"ボット起動エラー: {e}")
+    finally:
+        # 共有音声合成のクリーンアップタスクを停止
+        synthesizer = getattr(bot, 'voice_synthesizer', None)
+        if synthesizer is not None:
+            await synthesizer.close()
+        
+        # VOICEVOX 用の共有HTTPセッションを閉じる
+        from modules.http_session import voicevox_session
+        await voicevox_session.close()
+        
+        # データベース接続を閉じる
+        await db_manager.close()
 
 if __name__ == "__main__":
     try:
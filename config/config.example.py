@@ -14,7 +14,23 @@ DISCORD_TOKEN = os.getenv('DISCORD_TOKEN', '')
 APPLICATION_ID = os.getenv('APPLICATION_ID', '')
 
 # ===== データベース設定 =====
-DB_PATH = os.getenv('DB_PATH', 'bot_database.db')
+# SQLite の接続・チューニング設定（DatabaseManager にそのまま渡される）
+# 設定キー → (環境変数, デフォルト値)。デフォルト値は .env.example と同じにすること
+DATABASE_ENV = {
+    'db_path': ('DB_PATH', 'bot_database.db'),           # データベースファイルのパス
+    'pool_size': ('DB_POOL_SIZE', 4),                    # 読み取り用コネクション数
+    'journal_mode': ('DB_JOURNAL_MODE', 'WAL'),          # WAL で読み取りが書き込みを待たない
+    'synchronous': ('DB_SYNCHRONOUS', 'NORMAL'),         # OFF / NORMAL / FULL / EXTRA
+    'cache_size': ('DB_CACHE_SIZE', -8000),              # 負数はKiB単位（-8000 = 約8MB）
+    'mmap_size': ('DB_MMAP_SIZE', 67108864),             # メモリマップサイズ（バイト、0で無効）
+    'busy_timeout': ('DB_BUSY_TIMEOUT', 5000),           # ロック待ち時間（ミリ秒）
+    'write_batch_size': ('DB_WRITE_BATCH_SIZE', 64),     # 1トランザクションにまとめる書き込み数
+}
+DATABASE_CONFIG = {
+    key: type(default)(os.getenv(env_name, default))
+    for key, (env_name, default) in DATABASE_ENV.items()
+}
+DB_PATH = DATABASE_CONFIG['db_path']
 DB_BACKUP_ENABLED = os.getenv('DB_BACKUP_ENABLED', 'true').lower() == 'true'
 
 # ===== Keep-alive 設定 =====
@@ -30,6 +46,41 @@ LOG_DIR = os.getenv('LOG_DIR', 'logs')
 VOICEVOX_URL = os.getenv('VOICEVOX_URL', 'http://localhost:50021')
 VOICEVOX_ENABLED = os.getenv('VOICEVOX_ENABLED', 'true').lower() == 'true'
 
+# VOICEVOX 通信設定（ボット全体で1つの HTTP セッションを共有）
+VOICEVOX_CONFIG = {
+    'http': {
+        'limit': int(os.getenv('VOICEVOX_MAX_CONNECTIONS', '16')),           # 同時接続数の上限
+        'limit_per_host': int(os.getenv('VOICEVOX_MAX_CONNECTIONS_PER_HOST', '8')),
+        'keepalive_timeout': float(os.getenv('VOICEVOX_KEEPALIVE', '30')),  # keep-alive 保持時間（秒）
+        'total_timeout': float(os.getenv('VOICEVOX_TIMEOUT', '30')),        # 1リクエスト全体のタイムアウト（秒）
+        'connect_timeout': float(os.getenv('VOICEVOX_CONNECT_TIMEOUT', '5')),
+        'read_timeout': float(os.getenv('VOICEVOX_READ_TIMEOUT', '20')),
+    },
+    'debug_write_files': False, # True で読み上げ音声を一時WAVファイル経由で再生（デバッグ用）
+    'cleanup_interval': 600,    # 一時音声ファイルのクリーンアップ間隔（秒、debug_write_files 有効時のみ）
+    'max_file_age': 3600,       # この秒数より古い一時音声ファイルを削除
+    'queue': {
+        'max_depth': 20,            # ギルドごとの読み上げ待ちの上限
+        'prefetch': 3,              # 再生中に先読み合成する件数
+        'policy': 'drop_oldest',    # 上限超過時: drop_oldest（古い待ちを破棄）/ drop_newest（新着を破棄）
+        'max_age': 60.0,            # この秒数以上待ったメッセージは読み上げずに飛ばす
+    },
+    # 読み上げ中に届いた同じ話者の連続メッセージを1回の合成にまとめる
+    # （キューが空いているときのメッセージは待たずにすぐ読み上げる。別の話者の発言で区切るため
+    #   読み上げ順は変わらない。まとめたテキストは音声キャッシュに当たりにくい）
+    'coalesce': {
+        'window': 0.8,              # 読み上げ中に次のメッセージを待ってまとめる時間（秒、0 で無効）
+        'max_length': 200,          # まとめた読み上げテキストの最大文字数
+    },
+    'query_cache_size': 512,    # audio_query 結果を保持する件数（テキスト・話者ごと）
+    'cache': {
+        'memory_max_bytes': 32 * 1024 * 1024,       # メモリキャッシュの合計上限
+        'memory_item_max_bytes': 1024 * 1024,       # これ以下の小さな音声だけメモリに保持（48kHzステレオで約5秒）
+        'disk_max_bytes': 256 * 1024 * 1024,        # ディスクキャッシュの合計上限
+        'directory': None,                          # None で一時フォルダ内の cache を使用
+    },
+}
+
 # ===== 経済システム設定 =====
 ECONOMY_ENABLED = os.getenv('ECONOMY_ENABLED', 'true').lower() == 'true'
 DAILY_REWARD = int(os.getenv('DAILY_REWARD', '1000'))
@@ -51,6 +102,15 @@ CHINESE_CONVERSION = {
     'enabled': True,
     'violation_threshold': 3,  # 違反回数の上限
     'timeout_duration': 300,   # タイムアウト時間（秒）
+    'dictionary_dir': 'data/chinese',   # 変換辞書（*.json）のディレクトリ
+    'default_dictionary': 'default',    # 辞書未選択のギルドで使う辞書名
+}
+
+# グローバルチャット中継設定
+GLOBAL_CHAT_CONFIG = {
+    'queue_size': 100,          # 転送先チャンネルごとの送信キュー上限
+    'min_interval': 1.0,        # 同一チャンネルへの送信間隔（秒）、間に届いたメッセージはまとめて送信
+    'delivery': 'embed',        # 'embed' または 'webhook'（Webhookの管理権限が必要）
 }
 
 # ロールパネル設定
@@ -4,207 +4,1012 @@ import json
 import os
 import asyncio
 import aiosqlite
+import time
+from collections import deque
+from contextlib import asynccontextmanager
 from datetime import datetime
 import logging
 
+# 設定ファイル（任意）
+try:
+    import config
+except ImportError:
+    config = None
+
 # ログ設定
 db_logger = logging.getLogger('database')
 
+class PoolStats:
+    """コネクションプールの利用統計"""
+    
+    def __init__(self, window=60.0):
+        self.window = window  # checkouts/sec を計算する区間（秒）
+        self.in_use = 0
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._recent = deque(maxlen=10000)
+        
+    def record_checkout(self, wait_time):
+        """チェックアウトを記録"""
+        self.in_use += 1
+        self.checkouts += 1
+        self.total_wait += wait_time
+        self.max_wait = max(self.max_wait, wait_time)
+        self._recent.append(time.monotonic())
+        
+    def record_release(self):
+        """返却を記録"""
+        self.in_use -= 1
+        
+    def checkouts_per_sec(self):
+        """直近の区間での秒間チェックアウト数"""
+        cutoff = time.monotonic() - self.window
+        while self._recent and self._recent[0] < cutoff:
+            self._recent.popleft()
+        return len(self._recent) / self.window
+        
+    def snapshot(self):
+        """統計のスナップショットを辞書で返す"""
+        return {
+            'in_use': self.in_use,
+            'checkouts': self.checkouts,
+            'checkouts_per_sec': round(self.checkouts_per_sec(), 2),
+            'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            'max_wait_ms': round(self.max_wait * 1000, 3),
+        }
+
 class DatabaseManager:
-    def __init__(self, db_path="bot_database.db"):
+    # ホットパスのクエリと使われるべきインデックス（クエリプランの回帰チェック用）
+    HOT_QUERIES = {
+        'global_chat_lookup': (
+            'SELECT guild_id FROM guild_settings WHERE global_chat_channel_id = ?',
+            (0,), 'idx_guild_settings_global_chat'
+        ),
+        'global_chat_targets': (
+            'SELECT guild_id, global_chat_channel_id FROM guild_settings '
+            'WHERE global_chat_channel_id IS NOT NULL AND guild_id != ?',
+            (0,), 'idx_guild_settings_global_chat'
+        ),
+        'leaderboard': (
+            'SELECT user_id, balance, total_earned, mining_power FROM user_economy '
+            'WHERE guild_id = ? ORDER BY balance DESC LIMIT ?',
+            (0, 10), 'idx_user_economy_guild_balance'
+        ),
+        'user_transactions': (
+            'SELECT * FROM economy_transactions WHERE guild_id = ? AND user_id = ? '
+            'ORDER BY created_at DESC LIMIT ?',
+            (0, 0, 10), 'idx_transactions_guild_user_time'
+        ),
+        'user_mining_history': (
+            'SELECT * FROM mining_history WHERE guild_id = ? AND user_id = ? '
+            'ORDER BY created_at DESC LIMIT ?',
+            (0, 0, 10), 'idx_mining_history_guild_user_time'
+        ),
+        'user_items': (
+            'SELECT item_id, quantity FROM user_items WHERE guild_id = ? AND user_id = ?',
+            (0, 0), 'idx_user_items_guild_user'
+        ),
+        'shop_items': (
+            'SELECT id, item_name, item_description, price, item_type, effect_value FROM shop_items '
+            'WHERE guild_id = ? AND is_active = 1 ORDER BY price ASC',
+            (0,), 'idx_shop_items_guild_price'
+        ),
+        'user_part_inventory': (
+            'SELECT part_id, quantity FROM user_part_inventory WHERE guild_id = ? AND user_id = ?',
+            (0, 0), 'PRIMARY KEY'
+        ),
+        'user_pc_build': (
+            'SELECT part_id, quantity FROM user_pc_build_parts WHERE guild_id = ? AND user_id = ?',
+            (0, 0), 'PRIMARY KEY'
+        ),
+        'user_pc_build_stats': (
+            'SELECT hash_rate, power, efficiency, is_valid, message FROM user_pc_build_stats '
+            'WHERE guild_id = ? AND user_id = ?',
+            (0, 0), 'PRIMARY KEY'
+        ),
+    }
+    
+    # PRAGMA に渡せる値（文字列埋め込みのため許可リストで検証する）
+    JOURNAL_MODES = ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY")
+    SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+    
+    def __init__(self, db_path="bot_database.db", pool_size=4, journal_mode="WAL",
+                 synchronous="NORMAL", cache_size=-8000, mmap_size=67108864,
+                 busy_timeout=5000, write_batch_size=64):
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in self.JOURNAL_MODES:
+            raise ValueError(f"Unsupported journal_mode: {journal_mode}")
+        if synchronous not in self.SYNCHRONOUS_MODES:
+            raise ValueError(f"Unsupported synchronous mode: {synchronous}")
+        
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.cache_size = int(cache_size)      # 負数はKiB単位
+        self.mmap_size = int(mmap_size)        # バイト
+        self.busy_timeout = int(busy_timeout)  # ミリ秒
+        self.write_batch_size = write_batch_size
+        self._readers = []
+        self._reader_queue = None
+        self._writer = None
+        self._write_queue = None
+        self._writer_task = None
+        self._initialized = False
+        self._init_lock = None
+        self.reader_stats = PoolStats()
+        self.writer_stats = PoolStats()
+        self.write_batches = 0
+        self.write_jobs = 0
         self.init_database()
     
     def init_database(self):
-        """データベース初期化"""
+        """データベース初期化（未適用のマイグレーションのみ実行、失敗時は例外を送出）"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            # DDLを含めてトランザクションを自前で管理する
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            try:
                 cursor = conn.cursor()
                 
-                # ギルド設定テーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS guild_settings (
-                        guild_id INTEGER PRIMARY KEY,
-                        chinese_channels TEXT,
-                        global_chat_channel_id INTEGER,
-                        voice_mode BOOLEAN DEFAULT 1,
-                        music_mode BOOLEAN DEFAULT 0,
-                        auto_read_channel_id INTEGER,
-                        auto_read_voice TEXT DEFAULT 'voicevox',
-                        auto_read_speaker TEXT DEFAULT 'ずんだもん',
-                        auto_read_max_length INTEGER DEFAULT 100,
-                        log_channel_id INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # ユーザー音声設定テーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_voice_settings (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        speaker TEXT,
-                        emotion TEXT DEFAULT 'normal',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(guild_id, user_id)
-                    )
-                ''')
+                # ジャーナルモードはファイルに永続化される（トランザクション外で設定）
+                current_mode = cursor.execute('PRAGMA journal_mode').fetchone()[0]
+                if current_mode.upper() != self.journal_mode:
+                    cursor.execute(f'PRAGMA journal_mode={self.journal_mode}')
                 
-                # 経済システム - ユーザー残高テーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_economy (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        balance INTEGER DEFAULT 1000,
-                        total_earned INTEGER DEFAULT 1000,
-                        total_spent INTEGER DEFAULT 0,
-                        last_daily TIMESTAMP,
-                        mining_power INTEGER DEFAULT 1,
-                        mining_auto BOOLEAN DEFAULT 0,
-                        pc_parts TEXT DEFAULT '{}',
-                        inventory TEXT DEFAULT '{}',
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(guild_id, user_id)
-                    )
-                ''')
+                self.run_migrations(cursor)
+                db_logger.info("Database initialized successfully")
                 
-                # 既存テーブルにカラム追加（存在しない場合）
-                try:
-                    cursor.execute('ALTER TABLE user_economy ADD COLUMN pc_parts TEXT DEFAULT "{}"')
-                    cursor.execute('ALTER TABLE user_economy ADD COLUMN inventory TEXT DEFAULT "{}"')
-                except sqlite3.OperationalError:
-                    # カラムが既に存在する場合は無視
-                    pass
+                # ホットパスのクエリがインデックスを使っているか確認
+                for problem in self.check_query_plans(conn):
+                    db_logger.warning(f"Query plan regression: {problem}")
+            finally:
+                conn.close()
                 
-                # 経済システム - トランザクション履歴
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS economy_transactions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        transaction_type TEXT,
-                        amount INTEGER,
-                        description TEXT,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+        except Exception as e:
+            # 古いスキーマのまま動かすと新しいテーブルを使う処理が全て失敗するため起動を止める
+            db_logger.error(f"Database initialization error: {e}")
+            raise
+    
+    def _migrations(self):
+        """マイグレーション一覧（バージョン番号順、適用済みのものは変更しないこと）"""
+        return [
+            (1, "初期スキーマ", self._migration_001_initial_schema),
+            (2, "セカンダリインデックス", self._migration_002_indexes),
+            (3, "コグが参照するカラムの追加", self._migration_003_cog_columns),
+            (4, "えせ中国語辞書の選択", self._migration_004_chinese_dictionary),
+            (5, "PCパーツ所持品・構成の正規化", self._migration_005_pc_parts_tables),
+            (6, "PC構成の性能キャッシュ", self._migration_006_pc_build_stats),
+            (7, "PCパーツを固定IDで参照", self._migration_007_pc_part_ids),
+        ]
+    
+    def get_schema_version(self, cursor):
+        """適用済みのスキーマバージョンを取得"""
+        has_table = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+        ).fetchone()
+        if not has_table:
+            return 0
+        return cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+    
+    def run_migrations(self, cursor):
+        """未適用のマイグレーションを1トランザクションで適用"""
+        current = self.get_schema_version(cursor)
+        pending = [m for m in self._migrations() if m[0] > current]
+        if not pending:
+            return
+        
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            for version, description, migrate in pending:
+                migrate(cursor)
+                cursor.execute(
+                    'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                    (version, description)
+                )
+                db_logger.info(f"Applied migration {version}: {description}")
+            cursor.execute('COMMIT')
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+    
+    def _add_column(self, cursor, table, column, definition):
+        """カラムが存在しない場合のみ追加"""
+        columns = [row[1] for row in cursor.execute(f'PRAGMA table_info({table})')]
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+    
+    def _migration_001_initial_schema(self, cursor):
+        """初期スキーマ（既存のデータベースにも安全に適用できる）"""
+        # ギルド設定テーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS guild_settings (
+                guild_id INTEGER PRIMARY KEY,
+                chinese_channels TEXT,
+                global_chat_channel_id INTEGER,
+                voice_mode BOOLEAN DEFAULT 1,
+                music_mode BOOLEAN DEFAULT 0,
+                auto_read_channel_id INTEGER,
+                auto_read_voice TEXT DEFAULT 'voicevox',
+                auto_read_speaker TEXT DEFAULT 'ずんだもん',
+                auto_read_max_length INTEGER DEFAULT 100,
+                log_channel_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # ユーザー音声設定テーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_voice_settings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                speaker TEXT,
+                emotion TEXT DEFAULT 'normal',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(guild_id, user_id)
+            )
+        ''')
+        
+        # 経済システム - ユーザー残高テーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_economy (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                balance INTEGER DEFAULT 1000,
+                total_earned INTEGER DEFAULT 1000,
+                total_spent INTEGER DEFAULT 0,
+                last_daily TIMESTAMP,
+                mining_power INTEGER DEFAULT 1,
+                mining_auto BOOLEAN DEFAULT 0,
+                pc_parts TEXT DEFAULT '{}',
+                inventory TEXT DEFAULT '{}',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(guild_id, user_id)
+            )
+        ''')
+        
+        # 旧バージョンのテーブルにカラム追加（存在しない場合）
+        self._add_column(cursor, 'user_economy', 'pc_parts', "TEXT DEFAULT '{}'")
+        self._add_column(cursor, 'user_economy', 'inventory', "TEXT DEFAULT '{}'")
+        
+        # 経済システム - トランザクション履歴
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS economy_transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                transaction_type TEXT,
+                amount INTEGER,
+                description TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 経済システム - ショップアイテム
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS shop_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                item_name TEXT,
+                item_description TEXT,
+                price INTEGER,
+                item_type TEXT,
+                effect_value INTEGER,
+                is_active BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 経済システム - ユーザーアイテム所有
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                item_id INTEGER,
+                quantity INTEGER DEFAULT 1,
+                purchased_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (item_id) REFERENCES shop_items (id)
+            )
+        ''')
+        
+        # マイニング履歴
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mining_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                amount INTEGER,
+                mining_power INTEGER,
+                hash_rate INTEGER DEFAULT 1,
+                power_consumption INTEGER DEFAULT 100,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 旧バージョンのテーブルにカラム追加（存在しない場合）
+        self._add_column(cursor, 'mining_history', 'hash_rate', 'INTEGER DEFAULT 1')
+        self._add_column(cursor, 'mining_history', 'power_consumption', 'INTEGER DEFAULT 100')
+        
+        # 許可ユーザーテーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS allowed_users (
+                user_id INTEGER PRIMARY KEY,
+                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # スーパーユーザーテーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS super_users (
+                user_id INTEGER PRIMARY KEY,
+                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        # 違反記録テーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_violations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                violation_count INTEGER DEFAULT 0,
+                has_role BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(guild_id, user_id)
+            )
+        ''')
+        
+        # 自己紹介システムテーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_introductions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                guild_id INTEGER,
+                user_id INTEGER,
+                introduction_text TEXT,
+                intro_channel_id INTEGER,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(guild_id, user_id)
+            )
+        ''')
+        
+        # 自己紹介システム設定テーブル
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS intro_settings (
+                guild_id INTEGER PRIMARY KEY,
+                intro_channel_id INTEGER,
+                secret_role_name TEXT DEFAULT "秘密のロール",
+                is_enabled BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+    def _migration_002_indexes(self, cursor):
+        """ホットパス用のセカンダリインデックスを作成（以降のインデックスは新しいマイグレーションで追加する）"""
+        # 取引履歴: ギルド/ユーザー/時刻
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_guild_user_time
+            ON economy_transactions (guild_id, user_id, created_at)
+        ''')
+        
+        # マイニング履歴: ギルド/ユーザー/時刻
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_mining_history_guild_user_time
+            ON mining_history (guild_id, user_id, created_at)
+        ''')
+        
+        # 所有アイテム: ギルド/ユーザー
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_items_guild_user
+            ON user_items (guild_id, user_id)
+        ''')
+        
+        # グローバルチャット: チャンネルID → ギルド
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_guild_settings_global_chat
+            ON guild_settings (global_chat_channel_id) WHERE global_chat_channel_id IS NOT NULL
+        ''')
+        
+        # リーダーボード: ギルド内の残高順
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_user_economy_guild_balance
+            ON user_economy (guild_id, balance DESC)
+        ''')
+        
+        # ショップ: ギルド内の価格順
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_shop_items_guild_price
+            ON shop_items (guild_id, price)
+        ''')
+        
+        cursor.execute('ANALYZE')
+    
+    def _migration_003_cog_columns(self, cursor):
+        """コグが参照しているがスキーマに存在しなかったカラムを追加"""
+        # えせ中国語・自動読み上げ設定
+        self._add_column(cursor, 'guild_settings', 'chinese_channel_id', 'INTEGER')
+        self._add_column(cursor, 'guild_settings', 'chinese_locked', 'BOOLEAN DEFAULT 0')
+        self._add_column(cursor, 'guild_settings', 'auto_read_enabled', 'BOOLEAN DEFAULT 0')
+        
+        # VOICEVOX のユーザー音声設定
+        self._add_column(cursor, 'user_voice_settings', 'speaker_id', 'INTEGER DEFAULT 3')
+        self._add_column(cursor, 'user_voice_settings', 'speed', 'REAL DEFAULT 1.0')
+        self._add_column(cursor, 'user_voice_settings', 'pitch', 'REAL DEFAULT 0.0')
+        self._add_column(cursor, 'user_voice_settings', 'volume', 'REAL DEFAULT 1.0')
+        
+        # メンション許可はギルド単位（guild_id = 0 はJSONから移行したグローバル設定）
+        for table in ('allowed_users', 'super_users'):
+            cursor.execute(f'''
+                CREATE TABLE {table}_new (
+                    guild_id INTEGER NOT NULL DEFAULT 0,
+                    user_id INTEGER NOT NULL,
+                    username TEXT,
+                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (guild_id, user_id)
+                )
+            ''')
+            cursor.execute(f'''
+                INSERT INTO {table}_new (guild_id, user_id, added_at)
+                SELECT 0, user_id, added_at FROM {table}
+            ''')
+            cursor.execute(f'DROP TABLE {table}')
+            cursor.execute(f'ALTER TABLE {table}_new RENAME TO {table}')
+    
+    def _migration_004_chinese_dictionary(self, cursor):
+        """ギルドごとのえせ中国語辞書選択（NULL はデフォルト辞書）"""
+        self._add_column(cursor, 'guild_settings', 'chinese_dictionary', 'TEXT')
+    
+    def _migration_005_pc_parts_tables(self, cursor):
+        """PCパーツの所持品と構成を正規化テーブルへ移行
+        
+        user_economy.inventory / pc_parts のJSONは移行後は参照しない
+        （古い SQLite ではカラムを削除できないため残す）。
+        """
+        # 所持パーツ: (ギルド, ユーザー, 種類, パーツ名) ごとの個数
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_part_inventory (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                part_type TEXT NOT NULL,
+                part_name TEXT NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id, part_type, part_name)
+            ) WITHOUT ROWID
+        ''')
+        
+        # PC構成: スロット（gpus / cpu / motherboard / psu）ごとのパーツ
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_pc_build_parts (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                slot TEXT NOT NULL,
+                part_name TEXT NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (guild_id, user_id, slot, part_name)
+            ) WITHOUT ROWID
+        ''')
+        
+        inventory_rows = []
+        build_rows = []
+        rows = cursor.execute('''
+            SELECT guild_id, user_id, inventory, pc_parts FROM user_economy
+            WHERE (inventory IS NOT NULL AND inventory NOT IN ('', '{}'))
+               OR (pc_parts IS NOT NULL AND pc_parts NOT IN ('', '{}'))
+        ''').fetchall()
+        for guild_id, user_id, inventory_json, pc_parts_json in rows:
+            try:
+                inventory = json.loads(inventory_json or '{}')
+                pc_parts = json.loads(pc_parts_json or '{}')
+            except ValueError:
+                db_logger.warning(f"Skipping unreadable PC parts data (guild={guild_id}, user={user_id})")
+                continue
+            
+            for part_type, parts in inventory.items():
+                for part_name, quantity in parts.items():
+                    if quantity > 0:
+                        inventory_rows.append((guild_id, user_id, part_type, part_name, quantity))
+            
+            for slot, value in pc_parts.items():
+                if isinstance(value, dict):
+                    for part_name, quantity in value.items():
+                        build_rows.append((guild_id, user_id, slot, part_name, quantity))
+                elif value:
+                    build_rows.append((guild_id, user_id, slot, value, 1))
+        
+        cursor.executemany('''
+            INSERT OR IGNORE INTO user_part_inventory (guild_id, user_id, part_type, part_name, quantity)
+            VALUES (?, ?, ?, ?, ?)
+        ''', inventory_rows)
+        cursor.executemany('''
+            INSERT OR IGNORE INTO user_pc_build_parts (guild_id, user_id, slot, part_name, quantity)
+            VALUES (?, ?, ?, ?, ?)
+        ''', build_rows)
+        db_logger.info(f"Migrated PC parts: {len(inventory_rows)} inventory rows, {len(build_rows)} build rows")
+    
+    def _migration_006_pc_build_stats(self, cursor):
+        """保存済みPC構成の性能（ハッシュレート・消費電力・効率・有効性）を保持するテーブル
+        
+        既存構成の計算に使うパーツ性能は、このマイグレーション作成時点のカタログを固定値で持つ
+        （カタログの変更で適用済みマイグレーションの結果が変わらないようにする）。
+        """
+        # パーツ名 → (ハッシュレート, 消費電力)
+        gpus = {
+            "RTX 4090": (120, 450),
+            "RTX 4080": (95, 320),
+            "RTX 4070 Ti": (75, 285),
+            "RTX 4070": (65, 200),
+            "RTX 4060 Ti": (50, 165),
+            "RTX 4060": (40, 115),
+            "RTX 3090": (110, 350),
+            "RTX 3080": (85, 320),
+            "RTX 3070": (70, 220),
+            "RTX 3060 Ti": (60, 200),
+            "RTX 3060": (45, 170),
+            "RX 7900 XTX": (105, 355),
+            "RX 7900 XT": (90, 300),
+            "RX 7800 XT": (75, 263),
+            "RX 7700 XT": (60, 245),
+            "RX 7600": (45, 165),
+            "GTX 1660 Super": (30, 125),
+            "GTX 1650": (18, 75),
+        }
+        cpus = {
+            "i9-13900K": (25, 125),
+            "i7-13700K": (20, 125),
+            "i5-13600K": (15, 125),
+            "Ryzen 9 7950X": (28, 170),
+            "Ryzen 7 7700X": (22, 105),
+            "Ryzen 5 7600X": (18, 105),
+        }
+        # マザーボード → 最大GPU枚数、電源 → 容量
+        max_gpus_by_motherboard = {
+            "ASUS ROG MAXIMUS Z790 HERO": 4,
+            "MSI MAG B650 TOMAHAWK": 3,
+            "ASRock B550M PRO4": 2,
+        }
+        wattage_by_psu = {
+            "Corsair AX1600i": 1600,
+            "Seasonic Focus GX-850": 850,
+            "EVGA 600 W1": 600,
+        }
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_pc_build_stats (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                hash_rate INTEGER NOT NULL,
+                power INTEGER NOT NULL,
+                efficiency REAL NOT NULL,
+                is_valid BOOLEAN NOT NULL,
+                message TEXT,
+                PRIMARY KEY (guild_id, user_id)
+            ) WITHOUT ROWID
+        ''')
+        
+        # 既存の構成を計算しておく
+        builds = {}
+        for guild_id, user_id, slot, part_name, quantity in cursor.execute(
+            'SELECT guild_id, user_id, slot, part_name, quantity FROM user_pc_build_parts'
+        ).fetchall():
+            build = builds.setdefault((guild_id, user_id), {})
+            if slot == "gpus":
+                build.setdefault("gpus", {})[part_name] = quantity
+            else:
+                build[slot] = part_name
+        
+        stats_rows = []
+        for (guild_id, user_id), build in builds.items():
+            hash_rate = power = total_gpus = 0
+            for gpu_name, quantity in build.get("gpus", {}).items():
+                total_gpus += quantity
+                if gpu_name in gpus:
+                    hash_rate += gpus[gpu_name][0] * quantity
+                    power += gpus[gpu_name][1] * quantity
+            if build.get("cpu") in cpus:
+                hash_rate += cpus[build["cpu"]][0]
+                power += cpus[build["cpu"]][1]
+            efficiency = hash_rate / power if power > 0 else float(hash_rate)
+            
+            is_valid, message = True, "構成は有効です"
+            mb_name = build.get("motherboard")
+            psu_name = build.get("psu")
+            if "gpus" in build and mb_name in max_gpus_by_motherboard \
+                    and total_gpus > max_gpus_by_motherboard[mb_name]:
+                max_gpus = max_gpus_by_motherboard[mb_name]
+                is_valid, message = False, f"マザーボード {mb_name} は最大{max_gpus}枚のGPUしかサポートしていません"
+            elif psu_name in wattage_by_psu and power > wattage_by_psu[psu_name] * 0.8:  # 80%ルール
+                psu_wattage = wattage_by_psu[psu_name]
+                is_valid, message = False, f"電源容量が不足しています ({power}W > {int(psu_wattage * 0.8)}W)"
+            
+            stats_rows.append((guild_id, user_id, hash_rate, power, efficiency, is_valid, message))
+        
+        cursor.executemany('''
+            INSERT OR REPLACE INTO user_pc_build_stats (guild_id, user_id, hash_rate, power, efficiency, is_valid, message)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', stats_rows)
+    
+    def _migration_007_pc_part_ids(self, cursor):
+        """所持品・構成テーブルをパーツ名から固定のパーツIDでの参照に変更
+        
+        (種類, パーツ名) → パーツID の対応はこのマイグレーション作成時点のカタログを固定値で持つ。
+        """
+        part_ids = {
+            ("gpus", "RTX 4090"): 101,
+            ("gpus", "RTX 4080"): 102,
+            ("gpus", "RTX 4070 Ti"): 103,
+            ("gpus", "RTX 4070"): 104,
+            ("gpus", "RTX 4060 Ti"): 105,
+            ("gpus", "RTX 4060"): 106,
+            ("gpus", "RTX 3090"): 107,
+            ("gpus", "RTX 3080"): 108,
+            ("gpus", "RTX 3070"): 109,
+            ("gpus", "RTX 3060 Ti"): 110,
+            ("gpus", "RTX 3060"): 111,
+            ("gpus", "RX 7900 XTX"): 112,
+            ("gpus", "RX 7900 XT"): 113,
+            ("gpus", "RX 7800 XT"): 114,
+            ("gpus", "RX 7700 XT"): 115,
+            ("gpus", "RX 7600"): 116,
+            ("gpus", "GTX 1660 Super"): 117,
+            ("gpus", "GTX 1650"): 118,
+            ("cpus", "i9-13900K"): 201,
+            ("cpus", "i7-13700K"): 202,
+            ("cpus", "i5-13600K"): 203,
+            ("cpus", "Ryzen 9 7950X"): 204,
+            ("cpus", "Ryzen 7 7700X"): 205,
+            ("cpus", "Ryzen 5 7600X"): 206,
+            ("motherboards", "ASUS ROG MAXIMUS Z790 HERO"): 301,
+            ("motherboards", "MSI MAG B650 TOMAHAWK"): 302,
+            ("motherboards", "ASRock B550M PRO4"): 303,
+            ("psus", "Corsair AX1600i"): 401,
+            ("psus", "Seasonic Focus GX-850"): 402,
+            ("psus", "EVGA 600 W1"): 403,
+        }
+        slot_types = {"gpus": "gpus", "cpu": "cpus", "motherboard": "motherboards", "psu": "psus"}
+        
+        inventory_rows = []
+        for guild_id, user_id, part_type, part_name, quantity in cursor.execute(
+            'SELECT guild_id, user_id, part_type, part_name, quantity FROM user_part_inventory'
+        ).fetchall():
+            part_id = part_ids.get((part_type, part_name))
+            if part_id is None:
+                db_logger.warning(f"Dropping unknown inventory part {part_type}/{part_name} (guild={guild_id}, user={user_id})")
+                continue
+            inventory_rows.append((guild_id, user_id, part_id, quantity))
+        
+        build_rows = []
+        for guild_id, user_id, slot, part_name, quantity in cursor.execute(
+            'SELECT guild_id, user_id, slot, part_name, quantity FROM user_pc_build_parts'
+        ).fetchall():
+            part_id = part_ids.get((slot_types.get(slot), part_name))
+            if part_id is None:
+                db_logger.warning(f"Dropping unknown build part {slot}/{part_name} (guild={guild_id}, user={user_id})")
+                continue
+            build_rows.append((guild_id, user_id, part_id, quantity))
+        
+        cursor.execute('DROP TABLE user_part_inventory')
+        cursor.execute('''
+            CREATE TABLE user_part_inventory (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                part_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (guild_id, user_id, part_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.executemany(
+            'INSERT INTO user_part_inventory (guild_id, user_id, part_id, quantity) VALUES (?, ?, ?, ?)',
+            inventory_rows
+        )
+        
+        # スロットはパーツIDの種類から決まる
+        cursor.execute('DROP TABLE user_pc_build_parts')
+        cursor.execute('''
+            CREATE TABLE user_pc_build_parts (
+                guild_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                part_id INTEGER NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (guild_id, user_id, part_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.executemany(
+            'INSERT INTO user_pc_build_parts (guild_id, user_id, part_id, quantity) VALUES (?, ?, ?, ?)',
+            build_rows
+        )
+    
+    def check_query_plans(self, conn):
+        """HOT_QUERIES が期待するインデックスを使っているかを確認し、問題の一覧を返す"""
+        problems = []
+        for name, (sql, params, index_name) in self.HOT_QUERIES.items():
+            try:
+                plan = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+            except sqlite3.Error as e:
+                problems.append(f"{name}: {e}")
+                continue
+            
+            details = " / ".join(row[-1] for row in plan)
+            if index_name not in details:
+                problems.append(f"{name} does not use {index_name} ({details})")
+        return problems
+    
+    async def initialize(self):
+        """読み取り用コネクションプールと書き込みタスクを開始"""
+        if self._init_lock is None:
+            self._init_lock = asyncio.Lock()
+        
+        async with self._init_lock:
+            if self._initialized:
+                return
+            
+            try:
+                # 書き込み用はトランザクションを自前で管理するため autocommit で開く
+                self._writer = await aiosqlite.connect(self.db_path, isolation_level=None)
+                await self._apply_pragmas(self._writer)
                 
-                # 経済システム - ショップアイテム
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS shop_items (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        item_name TEXT,
-                        item_description TEXT,
-                        price INTEGER,
-                        item_type TEXT,
-                        effect_value INTEGER,
-                        is_active BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+                self._reader_queue = asyncio.Queue()
+                for _ in range(self.pool_size):
+                    conn = await aiosqlite.connect(self.db_path)
+                    await self._apply_pragmas(conn)
+                    await conn.execute('PRAGMA query_only=1')
+                    self._readers.append(conn)
+                    self._reader_queue.put_nowait(conn)
                 
-                # 経済システム - ユーザーアイテム所有
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_items (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        item_id INTEGER,
-                        quantity INTEGER DEFAULT 1,
-                        purchased_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY (item_id) REFERENCES shop_items (id)
-                    )
-                ''')
+                self._write_queue = asyncio.Queue()
+                self._writer_task = asyncio.create_task(self._writer_loop())
                 
-                # マイニング履歴
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS mining_history (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        amount INTEGER,
-                        mining_power INTEGER,
-                        hash_rate INTEGER DEFAULT 1,
-                        power_consumption INTEGER DEFAULT 100,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
+                self._initialized = True
+                db_logger.info(
+                    f"Connection pool opened (readers: {self.pool_size}, writer: 1, "
+                    f"journal_mode: {self.journal_mode}, synchronous: {self.synchronous})"
+                )
                 
-                # 既存テーブルにカラム追加（存在しない場合）
+            except Exception as e:
+                db_logger.error(f"Connection pool initialization error: {e}")
+                await self._close_connections()
+                raise
+    
+    async def _apply_pragmas(self, conn):
+        """コネクション単位のPRAGMAを設定"""
+        await conn.execute(f'PRAGMA synchronous={self.synchronous}')
+        await conn.execute(f'PRAGMA cache_size={self.cache_size}')
+        await conn.execute(f'PRAGMA mmap_size={self.mmap_size}')
+        await conn.execute(f'PRAGMA busy_timeout={self.busy_timeout}')
+    
+    def is_initialized(self):
+        """コネクションプールが利用可能か"""
+        return self._initialized
+    
+    async def close(self):
+        """書き込みキューを処理し切ってから全コネクションを閉じる"""
+        if not self._initialized:
+            return
+        
+        await self._close_connections()
+        db_logger.info("Connection pool closed")
+    
+    async def _close_connections(self):
+        """書き込みタスクを停止し、開いているコネクションを全て閉じる"""
+        self._initialized = False
+        
+        if self._writer_task is not None:
+            # 終了マーカーを投入し、それまでの書き込みを完了させる
+            self._write_queue.put_nowait(None)
+            try:
+                await self._writer_task
+            except Exception as e:
+                db_logger.error(f"Writer task error on shutdown: {e}")
+        self._writer_task = None
+        self._write_queue = None
+        
+        for conn in self._readers:
+            try:
+                await conn.close()
+            except Exception as e:
+                db_logger.error(f"Error closing reader connection: {e}")
+        self._readers = []
+        self._reader_queue = None
+        
+        if self._writer is not None:
+            try:
+                await self._writer.close()
+            except Exception as e:
+                db_logger.error(f"Error closing writer connection: {e}")
+        self._writer = None
+    
+    async def _writer_loop(self):
+        """書き込みジョブをキューから取り出し、まとめて1トランザクションでコミット
+        
+        ジョブごとにSAVEPOINTを張るため、失敗したジョブだけがロールバックされ
+        同じバッチ内の他のジョブには影響しない。
+        """
+        queue = self._write_queue
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            
+            # 溜まっているジョブを上限までまとめて取り出す
+            batch = [item]
+            stop = False
+            while len(batch) < self.write_batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            
+            await self._run_write_batch(batch)
+            if stop:
+                return
+    
+    async def _run_write_batch(self, batch):
+        """1バッチ分の書き込みジョブを実行"""
+        db = self._writer
+        outcomes = []
+        try:
+            await db.execute('BEGIN IMMEDIATE')
+            for job, future, submitted in batch:
+                self.writer_stats.record_checkout(time.monotonic() - submitted)
                 try:
-                    cursor.execute('ALTER TABLE mining_history ADD COLUMN hash_rate INTEGER DEFAULT 1')
-                    cursor.execute('ALTER TABLE mining_history ADD COLUMN power_consumption INTEGER DEFAULT 100')
-                except sqlite3.OperationalError:
-                    # カラムが既に存在する場合は無視
-                    pass
-                
-                # 許可ユーザーテーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS allowed_users (
-                        user_id INTEGER PRIMARY KEY,
-                        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # スーパーユーザーテーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS super_users (
-                        user_id INTEGER PRIMARY KEY,
-                        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                # 違反記録テーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_violations (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        violation_count INTEGER DEFAULT 0,
-                        has_role BOOLEAN DEFAULT 0,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(guild_id, user_id)
-                    )
-                ''')
-                
-                # 自己紹介システムテーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS user_introductions (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        guild_id INTEGER,
-                        user_id INTEGER,
-                        introduction_text TEXT,
-                        intro_channel_id INTEGER,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        UNIQUE(guild_id, user_id)
-                    )
-                ''')
-                
-                # 自己紹介システム設定テーブル
-                cursor.execute('''
-                    CREATE TABLE IF NOT EXISTS intro_settings (
-                        guild_id INTEGER PRIMARY KEY,
-                        intro_channel_id INTEGER,
-                        secret_role_name TEXT DEFAULT "秘密のロール",
-                        is_enabled BOOLEAN DEFAULT 1,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                ''')
-                
-                conn.commit()
-                db_logger.info("Database initialized successfully")
-                
+                    await db.execute('SAVEPOINT write_job')
+                    try:
+                        result = await job(db)
+                    except BaseException:
+                        await db.execute('ROLLBACK TO write_job')
+                        await db.execute('RELEASE write_job')
+                        raise
+                    await db.execute('RELEASE write_job')
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+                finally:
+                    self.writer_stats.record_release()
+            await db.execute('COMMIT')
+            
         except Exception as e:
-            db_logger.error(f"Database initialization error: {e}")
+            # コミット自体に失敗した場合はバッチ全体が失敗
+            db_logger.error(f"Write batch failed: {e}")
+            try:
+                await db.execute('ROLLBACK')
+            except Exception:
+                pass
+            outcomes = [(future, None, e) for _, future, _ in batch]
+        
+        self.write_batches += 1
+        self.write_jobs += len(batch)
+        
+        # 結果はコミット後に通知する
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+    
+    def submit_write(self, job):
+        """書き込みジョブ（db を受け取るコルーチン関数）をキューに投入し、Futureを返す"""
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((job, future, time.monotonic()))
+        return future
+    
+    async def run_write(self, job):
+        """書き込みジョブを実行し、コミット後にその戻り値を返す"""
+        if not self._initialized:
+            await self.initialize()
+        
+        return await self.submit_write(job)
+    
+    async def execute_write(self, sql, params=()):
+        """単一の書き込みSQLを実行"""
+        async def job(db):
+            await db.execute(sql, params)
+        
+        await self.run_write(job)
+    
+    @asynccontextmanager
+    async def reader(self):
+        """読み取り用コネクションをプールから借りる
+        
+        使用例:
+            async with db_manager.reader() as db:
+                cursor = await db.execute('SELECT ...')
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        queue = self._reader_queue
+        started = time.monotonic()
+        conn = await queue.get()
+        self.reader_stats.record_checkout(time.monotonic() - started)
+        try:
+            yield conn
+        finally:
+            self.reader_stats.record_release()
+            queue.put_nowait(conn)
+    
+    @asynccontextmanager
+    async def writer(self):
+        """書き込みキュー上で書き込み用コネクションを借りる
+        
+        ブロックは他のジョブと同じバッチの1ジョブとして実行され、バッチの
+        コミット完了後に抜ける。例外時はこのブロックの変更のみロールバックする。
+        ブロック内で db.commit() を呼ばないこと。writer() の入れ子は不可。
+        """
+        if not self._initialized:
+            await self.initialize()
+        
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+        done = loop.create_future()
+        
+        async def job(db):
+            if ready.done():
+                # 呼び出し側が既にキャンセルされている
+                return
+            ready.set_result(db)
+            await done
+        
+        job_future = self.submit_write(job)
+        try:
+            await asyncio.wait((ready, job_future), return_when=asyncio.FIRST_COMPLETED)
+        except BaseException:
+            if ready.done() and not ready.cancelled():
+                # ジョブは既にコネクションを受け取って待っている（待ちを解いてロールバックさせる）
+                done.set_exception(RuntimeError("writer block aborted"))
+            else:
+                ready.cancel()
+            job_future.cancel()
+            raise
+        
+        if not ready.done():
+            # バッチの開始自体に失敗した
+            ready.cancel()
+            job_future.result()
+        db = ready.result()
+        
+        try:
+            yield db
+        except BaseException:
+            # このブロックの変更だけをロールバックさせる
+            done.set_exception(RuntimeError("writer block aborted"))
+            job_future.cancel()
+            raise
+        
+        done.set_result(None)
+        await job_future
+    
+    def get_pool_stats(self):
+        """コネクションプールの統計を取得"""
+        return {
+            'pool_size': self.pool_size,
+            'initialized': self._initialized,
+            'journal_mode': self.journal_mode,
+            'reader': self.reader_stats.snapshot(),
+            'writer': self.writer_stats.snapshot(),
+            'write_queue': {
+                'depth': self._write_queue.qsize() if self._write_queue else 0,
+                'batches': self.write_batches,
+                'avg_batch_size': round(self.write_jobs / self.write_batches, 2) if self.write_batches else 0.0,
+            },
+        }
     
     def backup_database(self):
         """データベースをバックアップ"""
@@ -231,7 +1036,7 @@ class DatabaseManager:
             # 移行前にバックアップ作成
             self.backup_database()
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.writer() as db:
                 # 1. ギルド設定の移行
                 await self._migrate_guild_settings(db)
                 
@@ -243,14 +1048,12 @@ class DatabaseManager:
                 
                 # 4. 違反記録の移行
                 await self._migrate_violations(db)
-                
-                await db.commit()
-                
-                # 移行完了フラグを作成
-                with open('.migration_completed', 'w') as f:
-                    f.write(f"Migration completed at {datetime.now()}")
-                
-                db_logger.info("Complete JSON to DB migration finished")
+            
+            # 移行完了フラグを作成
+            with open('.migration_completed', 'w') as f:
+                f.write(f"Migration completed at {datetime.now()}")
+            
+            db_logger.info("Complete JSON to DB migration finished")
                 
         except Exception as e:
             db_logger.error(f"Migration error: {e}")
@@ -413,19 +1216,17 @@ class DatabaseManager:
         ]
         
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                for item_name, description, price, item_type, effect_value in default_items:
-                    await db.execute('''
-                        INSERT OR IGNORE INTO shop_items (
-                            guild_id, item_name, item_description, price, item_type, effect_value
-                        ) VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (guild_id, item_name, description, price, item_type, effect_value))
-                
-                await db.commit()
-                db_logger.info(f"Default shop items setup for guild {guild_id}")
-                
+            async with self.writer() as db:
+                await db.executemany('''
+                    INSERT OR IGNORE INTO shop_items (
+                        guild_id, item_name, item_description, price, item_type, effect_value
+                    ) VALUES (?, ?, ?, ?, ?, ?)
+                ''', [(guild_id, *item) for item in default_items])
+            
+            db_logger.info(f"Default shop items setup for guild {guild_id}")
+            
         except Exception as e:
             db_logger.error(f"Error setting up shop items: {e}")
 
 # グローバルインスタンス
-db_manager = DatabaseManager()
\ No newline at end of file
+db_manager = DatabaseManager(**getattr(config, 'DATABASE_CONFIG', {}))
\ No newline at end of file
@@ -2,13 +2,15 @@
 import discord
 from discord import app_commands
 import asyncio
-import aiosqlite
 import random
-import json
 from datetime import datetime, timedelta
 import logging
+import sqlite3
 from database import db_manager
-from modules.pc_parts import PCPartsData
+from modules.pc_parts import PCPartsData, PartsCatalog, parts_catalog
+
+# UPDATE ... RETURNING は SQLite 3.35.0 以降
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
 
 # ログ設定
 economy_logger = logging.getLogger('economy')
@@ -17,64 +19,108 @@ class EconomySystem:
     def __init__(self):
         self.currency_name = "RTKS Coin"
         self.currency_symbol = "🪙"
+        self.starting_balance = 1000
         self.daily_base_amount = 1000
         self.mining_base_reward = 50
+        # PCパーツショップの1個あたりの価格
+        self.pc_part_prices = {
+            "gpus": 100000,
+            "cpus": 80000,
+            "motherboards": 50000,
+            "psus": 30000
+        }
         
     async def get_user_balance(self, guild_id, user_id):
         """ユーザーの残高を取得"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT balance FROM user_economy 
                     WHERE guild_id = ? AND user_id = ?
                 ''', (guild_id, user_id))
                 result = await cursor.fetchone()
                 
-                if result:
-                    return result[0]
-                else:
-                    # 新規ユーザーの場合、初期残高で作成
-                    await db.execute('''
-                        INSERT INTO user_economy (guild_id, user_id, balance, total_earned)
-                        VALUES (?, ?, ?, ?)
-                    ''', (guild_id, user_id, 1000, 1000))
-                    await db.commit()
-                    return 1000
-                    
+            if result:
+                return result[0]
+            
+            # 新規ユーザーの場合、初期残高で作成
+            async with db_manager.writer() as db:
+                await self._ensure_account(db, guild_id, user_id)
+            return self.starting_balance
+            
         except Exception as e:
             economy_logger.error(f"Error getting user balance: {e}")
             return 0
     
+    async def _ensure_account(self, db, guild_id, user_id):
+        """口座が無ければ初期残高で作成（書き込みコネクション上で呼ぶ）"""
+        await db.execute('''
+            INSERT OR IGNORE INTO user_economy (guild_id, user_id, balance, total_earned)
+            VALUES (?, ?, ?, ?)
+        ''', (guild_id, user_id, self.starting_balance, self.starting_balance))
+    
+    async def apply_balance_change(self, db, guild_id, user_id, amount, transaction_type, description):
+        """残高の増減とトランザクション記録を同じトランザクション内で行う
+        
+        書き込みコネクション上で呼ぶこと。残高の加算と残高不足チェックを
+        1つの条件付きUPDATEで行うため、同時実行でも更新が失われない。
+        残高不足の場合は何も変更せず None を返す。
+        """
+        await self._ensure_account(db, guild_id, user_id)
+        
+        params = (amount, max(0, amount), max(0, -amount), guild_id, user_id, amount)
+        if SUPPORTS_RETURNING:
+            cursor = await db.execute('''
+                UPDATE user_economy 
+                SET balance = balance + ?, 
+                    total_earned = total_earned + ?,
+                    total_spent = total_spent + ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE guild_id = ? AND user_id = ? AND balance + ? >= 0
+                RETURNING balance
+            ''', params)
+            result = await cursor.fetchone()
+            await cursor.close()
+        else:
+            # RETURNING 非対応の SQLite (< 3.35) 向け。同じトランザクション内なので結果は同じ
+            cursor = await db.execute('''
+                UPDATE user_economy 
+                SET balance = balance + ?, 
+                    total_earned = total_earned + ?,
+                    total_spent = total_spent + ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE guild_id = ? AND user_id = ? AND balance + ? >= 0
+            ''', params)
+            result = None
+            if cursor.rowcount:
+                cursor = await db.execute('''
+                    SELECT balance FROM user_economy WHERE guild_id = ? AND user_id = ?
+                ''', (guild_id, user_id))
+                result = await cursor.fetchone()
+        
+        if not result:
+            return None
+        
+        # トランザクション記録
+        await db.execute('''
+            INSERT INTO economy_transactions (
+                guild_id, user_id, transaction_type, amount, description
+            ) VALUES (?, ?, ?, ?, ?)
+        ''', (guild_id, user_id, transaction_type, amount, description))
+        
+        return result[0]
+    
     async def update_balance(self, guild_id, user_id, amount, transaction_type, description):
         """残高を更新してトランザクション記録"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                # 現在の残高を取得
-                current_balance = await self.get_user_balance(guild_id, user_id)
-                new_balance = current_balance + amount
-                
-                if new_balance < 0:
-                    return False, "残高不足です"
-                
-                # 残高更新
-                await db.execute('''
-                    UPDATE user_economy 
-                    SET balance = ?, 
-                        total_earned = total_earned + ?,
-                        total_spent = total_spent + ?,
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE guild_id = ? AND user_id = ?
-                ''', (new_balance, max(0, amount), max(0, -amount), guild_id, user_id))
-                
-                # トランザクション記録
-                await db.execute('''
-                    INSERT INTO economy_transactions (
-                        guild_id, user_id, transaction_type, amount, description
-                    ) VALUES (?, ?, ?, ?, ?)
-                ''', (guild_id, user_id, transaction_type, amount, description))
-                
-                await db.commit()
-                return True, new_balance
+            async with db_manager.writer() as db:
+                new_balance = await self.apply_balance_change(
+                    db, guild_id, user_id, amount, transaction_type, description
+                )
+            
+            if new_balance is None:
+                return False, "残高不足です"
+            return True, new_balance
                 
         except Exception as e:
             economy_logger.error(f"Error updating balance: {e}")
@@ -83,7 +129,14 @@ class EconomySystem:
     async def daily_reward(self, guild_id, user_id):
         """デイリー報酬"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            # ランダムボーナス
+            base_amount = self.daily_base_amount
+            bonus_multiplier = random.uniform(1.0, 2.5)
+            final_amount = int(base_amount * bonus_multiplier)
+            
+            # クールダウン確認・残高更新・last_daily更新を1トランザクションで行う
+            cooldown_message = None
+            async with db_manager.writer() as db:
                 cursor = await db.execute('''
                     SELECT last_daily FROM user_economy 
                     WHERE guild_id = ? AND user_id = ?
@@ -96,35 +149,27 @@ class EconomySystem:
                         remaining = timedelta(hours=20) - (datetime.now() - last_daily)
                         hours = remaining.seconds // 3600
                         minutes = (remaining.seconds % 3600) // 60
-                        return False, f"次のデイリー報酬まで {hours}時間{minutes}分"
-                
-                # ランダムボーナス
-                base_amount = self.daily_base_amount
-                bonus_multiplier = random.uniform(1.0, 2.5)
-                final_amount = int(base_amount * bonus_multiplier)
-                
-                # 残高更新
-                success, new_balance = await self.update_balance(
-                    guild_id, user_id, final_amount, "daily", f"デイリー報酬 (x{bonus_multiplier:.2f})"
-                )
+                        cooldown_message = f"次のデイリー報酬まで {hours}時間{minutes}分"
                 
-                if success:
-                    # last_daily更新
+                if cooldown_message is None:
+                    new_balance = await self.apply_balance_change(
+                        db, guild_id, user_id, final_amount, "daily", f"デイリー報酬 (x{bonus_multiplier:.2f})"
+                    )
                     await db.execute('''
                         UPDATE user_economy 
                         SET last_daily = CURRENT_TIMESTAMP 
                         WHERE guild_id = ? AND user_id = ?
                     ''', (guild_id, user_id))
-                    await db.commit()
-                    
-                    return True, {
-                        'amount': final_amount,
-                        'multiplier': bonus_multiplier,
-                        'new_balance': new_balance
-                    }
-                
-                return False, "エラーが発生しました"
-                
+            
+            if cooldown_message:
+                return False, cooldown_message
+            
+            return True, {
+                'amount': final_amount,
+                'multiplier': bonus_multiplier,
+                'new_balance': new_balance
+            }
+            
         except Exception as e:
             economy_logger.error(f"Error in daily reward: {e}")
             return False, str(e)
@@ -132,99 +177,98 @@ class EconomySystem:
     async def mining_reward(self, guild_id, user_id):
         """PCパーツベースマイニング報酬"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                # ユーザーのPC構成を取得
+            async with db_manager.reader() as db:
+                # 構成保存時に計算済みのPC性能を取得（口座の有無も同時に確認）
                 cursor = await db.execute('''
-                    SELECT pc_parts, mining_power FROM user_economy 
-                    WHERE guild_id = ? AND user_id = ?
+                    SELECT s.hash_rate, s.power, s.efficiency, s.is_valid, s.message 
+                    FROM user_economy e
+                    LEFT JOIN user_pc_build_stats s ON s.guild_id = e.guild_id AND s.user_id = e.user_id
+                    WHERE e.guild_id = ? AND e.user_id = ?
                 ''', (guild_id, user_id))
                 result = await cursor.fetchone()
                 
-                if result and result[0]:
-                    # PC構成が存在する場合
-                    try:
-                        user_parts = json.loads(result[0])
-                        
-                        # PC構成の有効性チェック
-                        is_valid, message = PCPartsData.is_build_valid(user_parts)
-                        if not is_valid:
-                            return False, f"PC構成エラー: {message}"
-                        
-                        # ハッシュレート計算
-                        total_hash_rate = PCPartsData.calculate_total_hash_rate(user_parts)
-                        power_consumption = PCPartsData.calculate_power_consumption(user_parts)
-                        
-                        # マイニング効率計算（消費電力も考慮）
-                        efficiency = total_hash_rate / max(power_consumption, 1) if power_consumption > 0 else total_hash_rate
-                        
-                    except json.JSONDecodeError:
-                        # JSONパース失敗時は従来のmining_powerを使用
-                        total_hash_rate = result[1] if result[1] else 1
-                        efficiency = 1.0
-                        power_consumption = 100
-                else:
-                    # PC構成がない場合はデフォルト
-                    total_hash_rate = 1
-                    efficiency = 1.0
-                    power_consumption = 100
-                
-                # マイニング報酬計算
-                base_reward = int(self.mining_base_reward * total_hash_rate)
-                
-                # 効率ボーナス
-                efficiency_bonus = min(efficiency * 0.1, 0.5)  # 最大50%ボーナス
-                
-                # ランダム要素
-                variance = random.uniform(0.8, 1.2)
-                
-                # 電力コスト（高消費電力は報酬減少）
-                power_penalty = max(0.5, 1.0 - (power_consumption - 200) / 2000)
-                
-                final_reward = int(base_reward * (1 + efficiency_bonus) * variance * power_penalty)
-                
-                # 残高更新
-                success, new_balance = await self.update_balance(
-                    guild_id, user_id, final_reward, "mining", 
+            if result and result[0] is not None:
+                # PC構成が存在する場合
+                total_hash_rate, power_consumption, efficiency, is_valid, message = result
+                if not is_valid:
+                    return False, f"PC構成エラー: {message}"
+            elif result:
+                # 口座はあるがPC構成が空の場合（以前の空の pc_parts と同じく性能0）
+                total_hash_rate = 0
+                efficiency = 0
+                power_consumption = 0
+            else:
+                # 口座がまだない場合はデフォルト
+                total_hash_rate = 1
+                efficiency = 1.0
+                power_consumption = 100
+            
+            # マイニング報酬計算
+            base_reward = int(self.mining_base_reward * total_hash_rate)
+            
+            # 効率ボーナス
+            efficiency_bonus = min(efficiency * 0.1, 0.5)  # 最大50%ボーナス
+            
+            # ランダム要素
+            variance = random.uniform(0.8, 1.2)
+            
+            # 電力コスト（高消費電力は報酬減少）
+            power_penalty = max(0.5, 1.0 - (power_consumption - 200) / 2000)
+            
+            final_reward = int(base_reward * (1 + efficiency_bonus) * variance * power_penalty)
+            
+            # 残高更新とマイニング履歴記録を1トランザクションで行う
+            async with db_manager.writer() as db:
+                new_balance = await self.apply_balance_change(
+                    db, guild_id, user_id, final_reward, "mining", 
                     f"PCマイニング報酬 (ハッシュレート: {total_hash_rate} MH/s)"
                 )
-                
-                if success:
-                    # マイニング履歴記録
-                    await db.execute('''
-                        INSERT INTO mining_history (guild_id, user_id, amount, mining_power, hash_rate, power_consumption)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    ''', (guild_id, user_id, final_reward, total_hash_rate, total_hash_rate, power_consumption))
-                    await db.commit()
-                    
-                    return True, {
-                        'amount': final_reward,
-                        'hash_rate': total_hash_rate,
-                        'power_consumption': power_consumption,
-                        'efficiency': round(efficiency, 2),
-                        'new_balance': new_balance
-                    }
-                
+                await db.execute('''
+                    INSERT INTO mining_history (guild_id, user_id, amount, mining_power, hash_rate, power_consumption)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', (guild_id, user_id, final_reward, total_hash_rate, total_hash_rate, power_consumption))
+            
+            if new_balance is None:
                 return False, "エラーが発生しました"
-                
+            
+            return True, {
+                'amount': final_reward,
+                'hash_rate': total_hash_rate,
+                'power_consumption': power_consumption,
+                'efficiency': round(efficiency, 2),
+                'new_balance': new_balance
+            }
+            
         except Exception as e:
             economy_logger.error(f"Error in mining: {e}")
             return False, str(e)
     
+    async def _load_pc_build(self, db, guild_id, user_id):
+        """PC構成を構成辞書の形で読み込む（{"gpus": {名前: 枚数}, "cpu": 名前, ...}）"""
+        cursor = await db.execute('''
+            SELECT part_id, quantity FROM user_pc_build_parts 
+            WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        rows = await cursor.fetchall()
+        
+        pc_parts = {}
+        for part_id, quantity in rows:
+            part = parts_catalog.get(part_id)
+            if part is None:
+                continue
+            part_type, part_name, _ = part
+            if part_type == "gpus":
+                pc_parts.setdefault("gpus", {})[part_name] = quantity
+            else:
+                pc_parts[PartsCatalog.TYPE_SLOTS[part_type]] = part_name
+        return pc_parts
+    
     async def get_pc_build(self, guild_id, user_id):
         """ユーザーのPC構成を取得"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                cursor = await db.execute('''
-                    SELECT pc_parts FROM user_economy 
-                    WHERE guild_id = ? AND user_id = ?
-                ''', (guild_id, user_id))
-                result = await cursor.fetchone()
+            async with db_manager.reader() as db:
+                return await self._load_pc_build(db, guild_id, user_id)
                 
-                if result and result[0]:
-                    return json.loads(result[0])
-                else:
-                    return {}
-                    
         except Exception as e:
             economy_logger.error(f"Error getting PC build: {e}")
             return {}
@@ -232,67 +276,148 @@ class EconomySystem:
     async def update_pc_build(self, guild_id, user_id, pc_parts):
         """ユーザーのPC構成を更新"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                # PC構成をJSONで保存
-                pc_parts_json = json.dumps(pc_parts)
-                
+            rows = []
+            for slot, value in pc_parts.items():
+                part_type = PartsCatalog.SLOT_TYPES[slot]
+                parts = value if isinstance(value, dict) else {value: 1} if value else {}
+                for name, quantity in parts.items():
+                    part_id = parts_catalog.id_of(part_type, name)
+                    if part_id is None:
+                        raise ValueError(f"Unknown part: {part_type}/{name}")
+                    rows.append((guild_id, user_id, part_id, quantity))
+            
+            # 性能は保存時に1回だけ計算し、/mine ではカタログを参照しない
+            compiled = PCPartsData.compile_build(pc_parts)
+            
+            # 構成は丸ごと置き換える
+            async with db_manager.writer() as db:
                 await db.execute('''
-                    UPDATE user_economy 
-                    SET pc_parts = ?
-                    WHERE guild_id = ? AND user_id = ?
-                ''', (pc_parts_json, guild_id, user_id))
-                await db.commit()
+                    DELETE FROM user_pc_build_parts WHERE guild_id = ? AND user_id = ?
+                ''', (guild_id, user_id))
+                await db.executemany('''
+                    INSERT INTO user_pc_build_parts (guild_id, user_id, part_id, quantity)
+                    VALUES (?, ?, ?, ?)
+                ''', rows)
                 
-                return True
+                if rows:
+                    await db.execute('''
+                        INSERT OR REPLACE INTO user_pc_build_stats (
+                            guild_id, user_id, hash_rate, power, efficiency, is_valid, message
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (guild_id, user_id, *compiled))
+                else:
+                    await db.execute('''
+                        DELETE FROM user_pc_build_stats WHERE guild_id = ? AND user_id = ?
+                    ''', (guild_id, user_id))
                 
+            return True
+            
         except Exception as e:
             economy_logger.error(f"Error updating PC build: {e}")
             return False
     
-    async def add_part_to_inventory(self, guild_id, user_id, part_type, part_name, part_data):
-        """パーツをユーザーのインベントリに追加"""
+    async def get_inventory(self, guild_id, user_id):
+        """ユーザーの所持パーツを取得（{種類: {パーツ名: 個数}}）"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                # インベントリから既存のパーツを取得
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
-                    SELECT inventory FROM user_economy 
-                    WHERE guild_id = ? AND user_id = ?
+                    SELECT part_id, quantity FROM user_part_inventory 
+                    WHERE guild_id = ? AND user_id = ? AND quantity > 0
                 ''', (guild_id, user_id))
-                result = await cursor.fetchone()
-                
-                if result and result[0]:
-                    inventory = json.loads(result[0])
-                else:
-                    inventory = {}
-                
-                # パーツを追加
-                if part_type not in inventory:
-                    inventory[part_type] = {}
-                
-                if part_name in inventory[part_type]:
-                    inventory[part_type][part_name] += 1
-                else:
-                    inventory[part_type][part_name] = 1
-                
-                # インベントリを更新
-                inventory_json = json.dumps(inventory)
-                await db.execute('''
-                    UPDATE user_economy 
-                    SET inventory = ?
-                    WHERE guild_id = ? AND user_id = ?
-                ''', (inventory_json, guild_id, user_id))
-                await db.commit()
-                
-                return True
+                rows = await cursor.fetchall()
+            
+            inventory = {}
+            for part_id, quantity in rows:
+                part = parts_catalog.get(part_id)
+                if part:
+                    part_type, part_name, _ = part
+                    inventory.setdefault(part_type, {})[part_name] = quantity
+            return inventory
+            
+        except Exception as e:
+            economy_logger.error(f"Error getting inventory: {e}")
+            return {}
+    
+    async def apply_inventory_change(self, db, guild_id, user_id, part_type, counts):
+        """所持パーツの個数を加算する（書き込みコネクション上で呼ぶ）
+        
+        counts は {パーツ名: 加算する個数}。パーツIDの行を UPSERT で加算するため、
+        所持品全体を読み書きしない。
+        """
+        rows = []
+        for name, count in counts.items():
+            part_id = parts_catalog.id_of(part_type, name)
+            if part_id is None:
+                raise ValueError(f"Unknown part: {part_type}/{name}")
+            rows.append((guild_id, user_id, part_id, count))
+        
+        await db.executemany('''
+            INSERT INTO user_part_inventory (guild_id, user_id, part_id, quantity)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(guild_id, user_id, part_id)
+            DO UPDATE SET quantity = quantity + excluded.quantity
+        ''', rows)
+    
+    async def add_parts_to_inventory(self, guild_id, user_id, part_type, counts):
+        """複数のパーツをまとめてユーザーのインベントリに追加"""
+        try:
+            async with db_manager.writer() as db:
+                await self.apply_inventory_change(db, guild_id, user_id, part_type, counts)
                 
+            return True
+            
         except Exception as e:
-            economy_logger.error(f"Error adding part to inventory: {e}")
+            economy_logger.error(f"Error adding parts to inventory: {e}")
             return False
     
+    async def add_part_to_inventory(self, guild_id, user_id, part_type, part_name):
+        """パーツをユーザーのインベントリに追加"""
+        return await self.add_parts_to_inventory(guild_id, user_id, part_type, {part_name: 1})
+    
+    async def purchase_parts(self, guild_id, user_id, part_type, quantity):
+        """PCパーツをまとめて購入
+        
+        抽選は先に済ませ、支払いとインベントリへの追加を1トランザクションで行う。
+        残高不足の場合は何も変更しない。
+        """
+        try:
+            total_cost = self.pc_part_prices[part_type] * quantity
+            
+            acquired_parts = PCPartsData.get_random_parts(part_type, quantity)
+            counts = {}
+            for part_name, _ in acquired_parts:
+                counts[part_name] = counts.get(part_name, 0) + 1
+            
+            async with db_manager.writer() as db:
+                new_balance = await self.apply_balance_change(
+                    db, guild_id, user_id, -total_cost, "purchase", f"PCパーツ購入 ({part_type} x{quantity})"
+                )
+                if new_balance is None:
+                    cursor = await db.execute('''
+                        SELECT balance FROM user_economy WHERE guild_id = ? AND user_id = ?
+                    ''', (guild_id, user_id))
+                    result = await cursor.fetchone()
+                    balance = result[0] if result else 0
+                else:
+                    await self.apply_inventory_change(db, guild_id, user_id, part_type, counts)
+            
+            if new_balance is None:
+                return False, {'total_cost': total_cost, 'balance': balance}
+            
+            return True, {
+                'parts': acquired_parts,
+                'total_cost': total_cost,
+                'new_balance': new_balance
+            }
+            
+        except Exception as e:
+            economy_logger.error(f"Error purchasing parts: {e}")
+            return False, str(e)
+    
     async def get_shop_items(self, guild_id):
         """ショップアイテム一覧取得"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT id, item_name, item_description, price, item_type, effect_value
                     FROM shop_items 
@@ -310,7 +435,7 @@ class EconomySystem:
     async def buy_item(self, guild_id, user_id, item_id):
         """アイテム購入"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 # アイテム情報取得
                 cursor = await db.execute('''
                     SELECT item_name, price, item_type, effect_value
@@ -319,23 +444,18 @@ class EconomySystem:
                 ''', (item_id, guild_id))
                 item_data = await cursor.fetchone()
                 
-                if not item_data:
-                    return False, "アイテムが見つかりません"
-                
-                item_name, price, item_type, effect_value = item_data
-                
-                # 残高確認
-                current_balance = await self.get_user_balance(guild_id, user_id)
-                if current_balance < price:
-                    return False, f"残高不足です。必要: {price:,}{self.currency_symbol}"
-                
-                # 支払い処理
-                success, new_balance = await self.update_balance(
-                    guild_id, user_id, -price, "purchase", f"{item_name}を購入"
+            if not item_data:
+                return False, "アイテムが見つかりません"
+            
+            item_name, price, item_type, effect_value = item_data
+            
+            # 支払い・効果適用・所有記録を1トランザクションで行う
+            async with db_manager.writer() as db:
+                new_balance = await self.apply_balance_change(
+                    db, guild_id, user_id, -price, "purchase", f"{item_name}を購入"
                 )
-                
-                if not success:
-                    return False, "購入処理でエラーが発生しました"
+                if new_balance is None:
+                    return False, f"残高不足です。必要: {price:,}{self.currency_symbol}"
                 
                 # アイテム効果を適用
                 if item_type == "mining_power":
@@ -357,15 +477,13 @@ class EconomySystem:
                     VALUES (?, ?, ?, 1)
                 ''', (guild_id, user_id, item_id))
                 
-                await db.commit()
-                
-                return True, {
-                    'item_name': item_name,
-                    'price': price,
-                    'new_balance': new_balance,
-                    'effect': f"{item_type}: +{effect_value}"
-                }
-                
+            return True, {
+                'item_name': item_name,
+                'price': price,
+                'new_balance': new_balance,
+                'effect': f"{item_type}: +{effect_value}"
+            }
+            
         except Exception as e:
             economy_logger.error(f"Error buying item: {e}")
             return False, str(e)
@@ -373,7 +491,7 @@ class EconomySystem:
     async def get_leaderboard(self, guild_id, limit=10):
         """リーダーボード取得"""
         try:
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT user_id, balance, total_earned, mining_power
                     FROM user_economy 
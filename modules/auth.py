@@ -97,13 +97,11 @@ class AuthCog(commands.Cog):
                 return
 
             # データベースに追加
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 await db.execute('''
                     INSERT OR REPLACE INTO allowed_users (guild_id, user_id, username)
                     VALUES (?, ?, ?)
                 ''', (interaction.guild.id, interaction.user.id, interaction.user.display_name))
-                await db.commit()
 
             embed = discord.Embed(
                 title="✅ メンション許可",
@@ -132,13 +130,11 @@ class AuthCog(commands.Cog):
                 return
 
             # データベースに追加
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 await db.execute('''
                     INSERT OR REPLACE INTO super_users (guild_id, user_id, username)
                     VALUES (?, ?, ?)
                 ''', (interaction.guild.id, member.id, member.display_name))
-                await db.commit()
 
             embed = discord.Embed(
                 title="👑 特別権限付与",
@@ -167,19 +163,19 @@ class AuthCog(commands.Cog):
                 return
 
             # 権限チェック
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 # 特別権限チェック
+                # guild_id = 0 は全サーバー共通の設定
                 cursor = await db.execute('''
                     SELECT user_id FROM super_users 
-                    WHERE guild_id = ? AND user_id = ?
+                    WHERE guild_id IN (?, 0) AND user_id = ?
                 ''', (interaction.guild.id, interaction.user.id))
                 is_super = await cursor.fetchone() is not None
 
                 # 通常許可チェック
                 cursor = await db.execute('''
                     SELECT user_id FROM allowed_users 
-                    WHERE guild_id = ? AND user_id = ?
+                    WHERE guild_id IN (?, 0) AND user_id = ?
                 ''', (interaction.guild.id, member.id))
                 is_allowed = await cursor.fetchone() is not None
 
@@ -12,45 +12,34 @@ import re
 from datetime import datetime
 from typing import Optional, Dict, Set
 
+from modules.guild_settings import guild_settings_cache, global_chat_index
+from modules.global_relay import RelayPayload, create_relay
+from modules.chinese_converter import chinese_dictionaries
+
 # ログ設定
 channel_logger = logging.getLogger('channel')
 
 class ChannelManagementCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.chinese_conversion_map = self._create_chinese_map()
-        
-    def _create_chinese_map(self) -> Dict[str, str]:
-        """えせ中国語変換マップを作成"""
-        return {
-            'あ': '阿', 'い': '伊', 'う': '宇', 'え': '江', 'お': '於',
-            'か': '加', 'き': '基', 'く': '久', 'け': '計', 'こ': '古',
-            'が': '雅', 'ぎ': '義', 'ぐ': '具', 'げ': '下', 'ご': '語',
-            'さ': '佐', 'し': '師', 'す': '須', 'せ': '世', 'そ': '曽',
-            'ざ': '座', 'じ': '次', 'ず': '図', 'ぜ': '是', 'ぞ': '造',
-            'た': '太', 'ち': '地', 'つ': '津', 'て': '天', 'と': '都',
-            'だ': '打', 'ぢ': '遅', 'づ': '豆', 'で': '出', 'ど': '度',
-            'な': '奈', 'に': '二', 'ぬ': '奴', 'ね': '根', 'の': '野',
-            'は': '波', 'ひ': '比', 'ふ': '風', 'へ': '変', 'ほ': '保',
-            'ば': '馬', 'び': '美', 'ぶ': '武', 'べ': '部', 'ぼ': '母',
-            'ぱ': '巴', 'ぴ': '皮', 'ぷ': '普', 'ぺ': '辺', 'ぽ': '歩',
-            'ま': '真', 'み': '美', 'む': '無', 'め': '女', 'も': '母',
-            'や': '也', 'ゆ': '由', 'よ': '与',
-            'ら': '良', 'り': '利', 'る': '流', 'れ': '礼', 'ろ': '路',
-            'わ': '和', 'ゐ': '井', 'ゑ': '恵', 'を': '乎', 'ん': '无',
-            'ー': '―', 'ッ': '津', 'ャ': '也', 'ュ': '由', 'ョ': '与'
-        }
-
-    def convert_to_chinese(self, text: str) -> str:
-        """テキストをえせ中国語に変換"""
+        self.relay = create_relay(bot)
+
+    async def cog_load(self):
+        """Cog読み込み時に辞書をコンパイル（メッセージ処理中にファイルを読まないように）"""
+        if not chinese_dictionaries.names():
+            await asyncio.to_thread(chinese_dictionaries.reload)
+
+    async def cog_unload(self):
+        """Cog解除時に中継ワーカーを停止"""
+        await self.relay.close()
+
+    def convert_to_chinese(self, text: str, dictionary: Optional[str] = None) -> str:
+        """テキストをえせ中国語に変換（dictionary 省略時はデフォルト辞書）"""
         try:
-            result = ""
-            for char in text:
-                if char in self.chinese_conversion_map:
-                    result += self.chinese_conversion_map[char]
-                else:
-                    result += char
-            return result
+            converter = chinese_dictionaries.get(dictionary)
+            if converter is None:
+                return text
+            return converter.convert(text)
         except Exception as e:
             channel_logger.error(f"えせ中国語変換エラー: {e}")
             return text
@@ -70,13 +59,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースに保存
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    INSERT OR REPLACE INTO guild_settings 
-                    (guild_id, log_channel_id) VALUES (?, ?)
-                ''', (interaction.guild.id, channel.id))
-                await db.commit()
+            await guild_settings_cache.update(interaction.guild.id, log_channel_id=channel.id)
 
             embed = discord.Embed(
                 title="📝 ログチャンネル設定",
@@ -105,13 +88,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースに保存
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    INSERT OR REPLACE INTO guild_settings 
-                    (guild_id, chinese_channel_id) VALUES (?, ?)
-                ''', (interaction.guild.id, channel.id))
-                await db.commit()
+            await guild_settings_cache.update(interaction.guild.id, chinese_channel_id=channel.id)
 
             embed = discord.Embed(
                 title="🇨🇳 えせ中国語チャンネル設定",
@@ -144,14 +121,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースから削除
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    UPDATE guild_settings 
-                    SET chinese_channel_id = NULL 
-                    WHERE guild_id = ?
-                ''', (interaction.guild.id,))
-                await db.commit()
+            await guild_settings_cache.update(interaction.guild.id, chinese_channel_id=None)
 
             embed = discord.Embed(
                 title="🇨🇳 えせ中国語チャンネル解除",
@@ -179,13 +149,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースに保存
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    INSERT OR REPLACE INTO guild_settings 
-                    (guild_id, chinese_locked) VALUES (?, ?)
-                ''', (interaction.guild.id, True))
-                await db.commit()
+            await guild_settings_cache.update(interaction.guild.id, chinese_locked=True)
 
             embed = discord.Embed(
                 title="🔒 えせ中国語チャンネルロック",
@@ -218,14 +182,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースを更新
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    UPDATE guild_settings 
-                    SET chinese_locked = ? 
-                    WHERE guild_id = ?
-                ''', (False, interaction.guild.id))
-                await db.commit()
+            await guild_settings_cache.update(interaction.guild.id, chinese_locked=False)
 
             embed = discord.Embed(
                 title="🔓 えせ中国語チャンネルロック解除",
@@ -239,6 +196,62 @@ class ChannelManagementCog(commands.Cog):
             channel_logger.error(f"えせ中国語チャンネルロック解除エラー: {e}")
             await interaction.response.send_message("❌ えせ中国語チャンネルのロック解除に失敗しました。", ephemeral=True)
 
+    @app_commands.command(name="setchinesedict", description="えせ中国語の変換辞書を選択します（管理者限定）")
+    @app_commands.describe(name="使用する辞書名（省略するとデフォルト辞書）")
+    async def setchinesedict(self, interaction: discord.Interaction, name: Optional[str] = None):
+        """えせ中国語の変換辞書を選択"""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ このコマンドは管理者のみが使用できます。", ephemeral=True)
+            return
+
+        try:
+            from database import db_manager
+            if not db_manager.is_initialized():
+                await interaction.response.send_message("❌ データベースが利用できません。", ephemeral=True)
+                return
+
+            available = chinese_dictionaries.names()
+            if name is not None and name not in available:
+                await interaction.response.send_message(
+                    f"❌ 辞書 `{name}` が見つかりません。利用可能な辞書: {', '.join(available) or 'なし'}",
+                    ephemeral=True
+                )
+                return
+
+            # データベースに保存
+            await guild_settings_cache.update(interaction.guild.id, chinese_dictionary=name)
+
+            converter = chinese_dictionaries.get(name)
+            embed = discord.Embed(
+                title="📖 えせ中国語辞書設定",
+                description=f"変換辞書を `{converter.name if converter else name}` に設定しました。",
+                color=0x0099ff,
+                timestamp=datetime.now()
+            )
+            if converter and converter.description:
+                embed.add_field(name="説明", value=converter.description, inline=False)
+            await interaction.response.send_message(embed=embed)
+
+        except Exception as e:
+            channel_logger.error(f"えせ中国語辞書設定エラー: {e}")
+            await interaction.response.send_message("❌ 変換辞書の設定に失敗しました。", ephemeral=True)
+
+    @app_commands.command(name="reloadchinesedict", description="えせ中国語の変換辞書を再読み込みします（ボット所有者限定）")
+    async def reloadchinesedict(self, interaction: discord.Interaction):
+        """辞書ファイルを再読み込み（全ギルド共通）"""
+        if not await self.bot.is_owner(interaction.user):
+            await interaction.response.send_message("❌ このコマンドはボットの所有者のみが使用できます。", ephemeral=True)
+            return
+
+        count = await asyncio.to_thread(chinese_dictionaries.reload)
+        if count:
+            await interaction.response.send_message(
+                f"✅ 変換辞書を再読み込みしました（{count}件: {', '.join(chinese_dictionaries.names())}）",
+                ephemeral=True
+            )
+        else:
+            await interaction.response.send_message("❌ 辞書を読み込めなかったため、現在の辞書を維持しました。", ephemeral=True)
+
     @app_commands.command(name="setglobalchat", description="えせ中国語グローバルチャットチャンネルを設定します（管理者限定）")
     @app_commands.describe(channel="グローバルチャットに使用するチャンネル")
     async def setglobalchat(self, interaction: discord.Interaction, channel: discord.TextChannel):
@@ -254,13 +267,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースに保存
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    INSERT OR REPLACE INTO guild_settings 
-                    (guild_id, global_chat_channel_id) VALUES (?, ?)
-                ''', (interaction.guild.id, channel.id))
-                await db.commit()
+            await guild_settings_cache.update(interaction.guild.id, global_chat_channel_id=channel.id)
 
             embed = discord.Embed(
                 title="🌐 グローバルチャット設定",
@@ -293,14 +300,9 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースから削除
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    UPDATE guild_settings 
-                    SET global_chat_channel_id = NULL 
-                    WHERE guild_id = ?
-                ''', (interaction.guild.id,))
-                await db.commit()
+            old_channel_id = global_chat_index.channel_for(interaction.guild.id)
+            await guild_settings_cache.update(interaction.guild.id, global_chat_channel_id=None)
+            self.relay.discard(old_channel_id)
 
             embed = discord.Embed(
                 title="🌐 グローバルチャット解除",
@@ -314,6 +316,51 @@ class ChannelManagementCog(commands.Cog):
             channel_logger.error(f"グローバルチャット解除エラー: {e}")
             await interaction.response.send_message("❌ グローバルチャットの解除に失敗しました。", ephemeral=True)
 
+    @app_commands.command(name="relaystats", description="グローバルチャット中継の統計を表示します（管理者限定）")
+    async def relaystats(self, interaction: discord.Interaction):
+        """グローバルチャット中継統計"""
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("❌ このコマンドは管理者のみが使用できます。", ephemeral=True)
+            return
+
+        stats = self.relay.get_stats()
+        embed = discord.Embed(
+            title="🌐 グローバルチャット中継統計",
+            color=0x0099ff,
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="接続チャンネル数", value=f"{len(global_chat_index)}", inline=True)
+        embed.add_field(name="転送先キュー", value=f"{stats['destinations']}", inline=True)
+        embed.add_field(name="配送方式", value=f"{stats['delivery']}（Webhook {stats['webhooks']}件）", inline=True)
+        embed.add_field(
+            name="キュー",
+            value=(
+                f"**待機中**: {stats['queue_depth']}\n"
+                f"**最大待機数**: {stats['max_queue_depth']}"
+            ),
+            inline=False
+        )
+        embed.add_field(
+            name="配送",
+            value=(
+                f"**中継メッセージ**: {stats['relayed']:,}\n"
+                f"**送信回数**: {stats['sent_messages']:,}\n"
+                f"**送信Embed数**: {stats['sent_embeds']:,}\n"
+                f"**破棄**: {stats['dropped']:,}\n"
+                f"**失敗**: {stats['failed']:,}"
+            ),
+            inline=True
+        )
+        embed.add_field(
+            name="遅延",
+            value=(
+                f"**平均**: {stats['avg_latency_ms']:.1f}ms\n"
+                f"**最大**: {stats['max_latency_ms']:.1f}ms"
+            ),
+            inline=True
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
     @app_commands.command(name="checkviolations", description="違反回数を確認します")
     @app_commands.describe(member="確認するメンバー（省略すると自分）")
     async def checkviolations(self, interaction: discord.Interaction, member: Optional[discord.Member] = None):
@@ -327,8 +374,7 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースから違反回数を取得
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT violation_count FROM user_violations 
                     WHERE guild_id = ? AND user_id = ?
@@ -371,13 +417,11 @@ class ChannelManagementCog(commands.Cog):
                 return
 
             # データベースから違反回数をリセット
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 await db.execute('''
                     DELETE FROM user_violations 
                     WHERE guild_id = ? AND user_id = ?
                 ''', (interaction.guild.id, member.id))
-                await db.commit()
 
             embed = discord.Embed(
                 title="🔄 違反回数リセット",
@@ -391,115 +435,56 @@ class ChannelManagementCog(commands.Cog):
             channel_logger.error(f"違反回数リセットエラー: {e}")
             await interaction.response.send_message("❌ 違反回数のリセットに失敗しました。", ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """メッセージイベント処理"""
-        if message.author.bot:
-            return
+    # メッセージイベントは bot.py の MessageRouter から配送される
 
-        try:
-            # えせ中国語チャンネル処理
-            await self._handle_chinese_channel(message)
-            
-            # グローバルチャット処理
-            await self._handle_global_chat(message)
-            
-        except Exception as e:
-            channel_logger.error(f"メッセージ処理エラー: {e}")
+    @staticmethod
+    def is_chinese_channel(message, settings: Dict) -> bool:
+        """えせ中国語チャンネルへのメッセージか"""
+        return settings['chinese_channel_id'] == message.channel.id
 
-    async def _handle_chinese_channel(self, message):
+    @staticmethod
+    def is_global_chat(message, settings: Dict) -> bool:
+        """グローバルチャットチャンネルへのメッセージか"""
+        return global_chat_index.guild_for(message.channel.id) == message.guild.id
+
+    async def _handle_chinese_channel(self, message, settings: Dict):
         """えせ中国語チャンネル処理"""
         try:
-            from database import db_manager
-            if not db_manager.is_initialized():
-                return
-
-            # 設定を取得
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                cursor = await db.execute('''
-                    SELECT chinese_channel_id, chinese_locked 
-                    FROM guild_settings WHERE guild_id = ?
-                ''', (message.guild.id,))
-                result = await cursor.fetchone()
-                
-                if not result or not result[0]:
-                    return
+            # えせ中国語に変換
+            converted_text = self.convert_to_chinese(message.content, settings['chinese_dictionary'])
+            
+            if converted_text != message.content:
+                # メッセージを削除して変換版を送信
+                await message.delete()
                 
-                chinese_channel_id, is_locked = result
+                embed = discord.Embed(
+                    description=converted_text,
+                    color=message.author.color or 0x99aab5,
+                    timestamp=datetime.now()
+                )
+                embed.set_author(
+                    name=message.author.display_name,
+                    icon_url=message.author.display_avatar.url
+                )
                 
-                if message.channel.id != chinese_channel_id:
-                    return
-
-                # えせ中国語に変換
-                converted_text = self.convert_to_chinese(message.content)
-                
-                if converted_text != message.content:
-                    # メッセージを削除して変換版を送信
-                    await message.delete()
-                    
-                    embed = discord.Embed(
-                        description=converted_text,
-                        color=message.author.color or 0x99aab5,
-                        timestamp=datetime.now()
-                    )
-                    embed.set_author(
-                        name=message.author.display_name,
-                        icon_url=message.author.display_avatar.url
-                    )
-                    
-                    await message.channel.send(embed=embed)
+                await message.channel.send(embed=embed)
 
         except Exception as e:
             channel_logger.error(f"えせ中国語処理エラー: {e}")
 
-    async def _handle_global_chat(self, message):
+    async def _handle_global_chat(self, message, settings: Dict):
         """グローバルチャット処理"""
         try:
-            from database import db_manager
-            if not db_manager.is_initialized():
+            # 転送先はインデックスで事前計算済み
+            targets = global_chat_index.targets_for(message.channel.id)
+            if not targets or not message.content:
                 return
 
-            # 現在のチャンネルがグローバルチャットかチェック
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                cursor = await db.execute('''
-                    SELECT guild_id FROM guild_settings 
-                    WHERE global_chat_channel_id = ?
-                ''', (message.channel.id,))
-                result = await cursor.fetchone()
-                
-                if not result:
-                    return
+            # 送信内容は1回だけ作成して全転送先で共有
+            payload = RelayPayload.from_message(message)
 
-                # 他のグローバルチャットチャンネルを取得
-                cursor = await db.execute('''
-                    SELECT guild_id, global_chat_channel_id 
-                    FROM guild_settings 
-                    WHERE global_chat_channel_id IS NOT NULL 
-                    AND guild_id != ?
-                ''', (message.guild.id,))
-                other_channels = await cursor.fetchall()
-
-                # 他のチャンネルにメッセージを転送
-                for guild_id, channel_id in other_channels:
-                    try:
-                        channel = self.bot.get_channel(channel_id)
-                        if channel:
-                            embed = discord.Embed(
-                                description=message.content,
-                                color=message.author.color or 0x99aab5,
-                                timestamp=datetime.now()
-                            )
-                            embed.set_author(
-                                name=f"{message.author.display_name} ({message.guild.name})",
-                                icon_url=message.author.display_avatar.url
-                            )
-                            embed.set_footer(text="グローバルチャット")
-                            
-                            await channel.send(embed=embed)
-                    except:
-                        pass  # エラーは無視
+            # 他のチャンネルにメッセージを転送（送信は転送先ごとのワーカーが並列に行う）
+            self.relay.relay(payload, targets)
 
         except Exception as e:
             channel_logger.error(f"グローバルチャット処理エラー: {e}")
@@ -0,0 +1,177 @@
+"""
+RTKS Discord Bot - えせ中国語変換モジュール
+変換マップを事前コンパイルした高速変換器と、データファイルから読み込む辞書レジストリ
+"""
+
+import json
+import logging
+import re
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# ログ設定
+converter_logger = logging.getLogger('chinese_converter')
+
+# ひらがなとカタカナのコードポイント差
+KANA_OFFSET = ord('ア') - ord('あ')
+
+# トライの終端を表すキー
+_END = ''
+
+def with_kana_variants(mapping: Mapping[str, str]) -> Dict[str, str]:
+    """ひらがなの1文字エントリを対応するカタカナにも展開（カタカナの定義があればそちらを優先）
+
+    カタカナだけのエントリはひらがなに展開しない（ッ は変換しても っ は変換しない）。
+    """
+    expanded = dict(mapping)
+    for source, target in mapping.items():
+        if len(source) == 1 and 'ぁ' <= source <= 'ゖ':
+            expanded.setdefault(chr(ord(source) + KANA_OFFSET), target)
+    return expanded
+
+class ChineseConverter:
+    """えせ中国語変換器
+
+    1文字の置換は str.translate 用のテーブルに、複数文字の語句はトライに
+    コンパイルする。トライは最長一致を優先する正規表現に変換して照合し、
+    語句に一致しなかった区間だけを translate で変換する。
+    """
+
+    def __init__(self, mapping: Mapping[str, str], name: str = 'default', description: str = ''):
+        self.name = name
+        self.description = description
+        chars = {source: target for source, target in mapping.items() if len(source) == 1}
+        self._phrases = MappingProxyType(
+            {source: target for source, target in mapping.items() if len(source) > 1}
+        )
+        self._table = str.maketrans(chars)
+        self._pattern = self._compile_phrases(self._phrases)
+
+    @staticmethod
+    def _build_trie(phrases) -> Dict:
+        """語句からトライ（ネストした辞書）を作成"""
+        root = {}
+        for phrase in phrases:
+            node = root
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node[_END] = True
+        return root
+
+    @classmethod
+    def _trie_pattern(cls, node: Dict) -> str:
+        """トライのノードを正規表現に変換（長い一致を優先）"""
+        branches = [
+            re.escape(char) + cls._trie_pattern(child)
+            for char, child in sorted(node.items()) if char != _END
+        ]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # 終端ノードでも続きがあれば貪欲に長い方を試す
+        return f"(?:{body})?" if _END in node else body
+
+    @classmethod
+    def _compile_phrases(cls, phrases):
+        """複数文字の語句を照合用の正規表現にコンパイル"""
+        if not phrases:
+            return None
+        return re.compile(cls._trie_pattern(cls._build_trie(phrases)))
+
+    def convert(self, text: str) -> str:
+        """テキストを変換"""
+        # 語句を含まないメッセージは translate 1回で済ませる
+        first = self._pattern.search(text) if self._pattern else None
+        if first is None:
+            return text.translate(self._table)
+
+        parts = []
+        position = 0
+        for match in self._pattern.finditer(text, first.start()):
+            parts.append(text[position:match.start()].translate(self._table))
+            parts.append(self._phrases[match.group()])
+            position = match.end()
+        parts.append(text[position:].translate(self._table))
+        return ''.join(parts)
+
+    def __len__(self) -> int:
+        return len(self._table) + len(self._phrases)
+
+class ChineseDictionaryRegistry:
+    """えせ中国語辞書のレジストリ
+
+    辞書ディレクトリ内の *.json をすべてコンパイルして保持する。
+    reload() は新しい辞書一式を作り終えてから参照を1回で差し替えるため、
+    変換中のメッセージが読み込み途中の状態を見ることはない。
+    """
+
+    def __init__(self, directory, default: str = 'default'):
+        directory = Path(directory)
+        if not directory.is_absolute():
+            directory = Path(__file__).resolve().parent.parent / directory
+        self.directory = directory
+        self.default = default
+        self._converters: Mapping[str, ChineseConverter] = MappingProxyType({})
+
+    def _load_file(self, path: Path) -> ChineseConverter:
+        """辞書ファイルを読み込んでコンパイル"""
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+
+        mapping = dict(data.get('entries', {}))
+        mapping.update(data.get('phrases', {}))
+        if data.get('kana_variants', True):
+            mapping = with_kana_variants(mapping)
+        return ChineseConverter(
+            mapping,
+            name=data.get('name', path.stem),
+            description=data.get('description', '')
+        )
+
+    def reload(self) -> int:
+        """辞書ディレクトリを読み直して差し替え（読み込めた辞書数を返す）"""
+        converters = {}
+        for path in sorted(self.directory.glob('*.json')):
+            try:
+                converter = self._load_file(path)
+            except (OSError, ValueError, AttributeError) as e:
+                converter_logger.error(f"辞書の読み込みに失敗しました ({path.name}): {e}")
+                continue
+            converters[converter.name] = converter
+
+        if not converters:
+            converter_logger.error(f"辞書が見つからないため現在の辞書を維持します: {self.directory}")
+            return 0
+
+        self._converters = MappingProxyType(converters)
+        converter_logger.info(f"えせ中国語辞書を読み込みました: {', '.join(converters)}")
+        return len(converters)
+
+    def get(self, name: Optional[str] = None) -> Optional[ChineseConverter]:
+        """辞書を取得（存在しなければデフォルト辞書、読み込み前は None）
+
+        ファイルの読み込みはしない。起動時に reload() を別スレッドで実行しておくこと。
+        """
+        converters = self._converters
+        return converters.get(name or self.default) or converters.get(self.default)
+
+    def names(self) -> List[str]:
+        """読み込み済みの辞書名一覧"""
+        return list(self._converters)
+
+def create_registry() -> ChineseDictionaryRegistry:
+    """設定ファイルの CHINESE_CONVERSION から辞書レジストリを作成"""
+    conversion_config = getattr(config, 'CHINESE_CONVERSION', {})
+    return ChineseDictionaryRegistry(
+        conversion_config.get('dictionary_dir', 'data/chinese'),
+        default=conversion_config.get('default_dictionary', 'default')
+    )
+
+# グローバルインスタンス
+chinese_dictionaries = create_registry()
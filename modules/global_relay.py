@@ -0,0 +1,341 @@
+"""
+RTKS Discord Bot - グローバルチャット中継モジュール
+転送先チャンネルごとの送信キューとワーカーによる並列中継
+"""
+
+import discord
+import aiohttp
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# ログ設定
+relay_logger = logging.getLogger('global_relay')
+
+class RelayPayload:
+    """中継する1メッセージ分の送信内容（元メッセージごとに1回だけ作成し全転送先で共有）"""
+
+    __slots__ = ('content', 'username', 'avatar_url', 'color', 'created_at', '_embed')
+
+    def __init__(self, content: str, username: str, avatar_url: str, color, created_at: datetime):
+        self.content = content
+        self.username = username
+        self.avatar_url = avatar_url
+        self.color = color
+        self.created_at = created_at
+        self._embed = None
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> 'RelayPayload':
+        """Discordメッセージから送信内容を作成"""
+        return cls(
+            content=message.content,
+            username=f"{message.author.display_name} ({message.guild.name})",
+            avatar_url=message.author.display_avatar.url,
+            color=message.author.color or 0x99aab5,
+            created_at=datetime.now()
+        )
+
+    @property
+    def embed_length(self) -> int:
+        """Embed配送時に Discord の文字数上限に数えられる文字数"""
+        return len(self.content) + len(self.username) + len(GlobalChatRelay.EMBED_FOOTER)
+
+    @property
+    def embed(self) -> discord.Embed:
+        """Embed配送用の表示（必要になった時点で1回だけ作成）"""
+        if self._embed is None:
+            embed = discord.Embed(
+                description=self.content,
+                color=self.color,
+                timestamp=self.created_at
+            )
+            embed.set_author(name=self.username, icon_url=self.avatar_url)
+            embed.set_footer(text=GlobalChatRelay.EMBED_FOOTER)
+            self._embed = embed
+        return self._embed
+
+class GlobalChatRelay:
+    """グローバルチャットの中継エンジン
+
+    転送先チャンネルごとに上限付きキューとワーカーを持ち、
+    1つのチャンネルの遅延が他の転送先を止めないようにする。
+    ワーカーは同一チャンネルへの送信間隔を空け、その間に溜まった
+    メッセージを1回の送信（最大10件のEmbed）にまとめる。
+
+    use_webhooks を有効にすると、転送先ごとに1つWebhookを作成・キャッシュし、
+    発言者の名前とアイコンでそのまま投稿する（Webhookが使えないチャンネルはEmbedで送信）。
+    """
+
+    # Discord の1メッセージあたりのEmbed上限
+    MAX_EMBEDS_PER_MESSAGE = 10
+    # Discord の1メッセージ内の全Embedの合計文字数上限
+    MAX_EMBED_TOTAL_LENGTH = 6000
+    # 中継Embedのフッター
+    EMBED_FOOTER = "グローバルチャット"
+    # Discord の1メッセージあたりの文字数上限
+    MAX_CONTENT_LENGTH = 2000
+    # 中継用Webhookの名前
+    WEBHOOK_NAME = "RTKS Global Chat"
+
+    def __init__(self, bot, queue_size: int = 100, min_interval: float = 1.0, use_webhooks: bool = False):
+        self.bot = bot
+        self.queue_size = queue_size
+        self.min_interval = min_interval
+        self.use_webhooks = use_webhooks
+        self._queues: Dict[int, asyncio.Queue] = {}
+        self._workers: Dict[int, asyncio.Task] = {}
+        self._last_sent: Dict[int, float] = {}
+        # チャンネルID → 前回のまとめに入りきらず次の送信に回した1件
+        self._carry: Dict[int, tuple] = {}
+        # チャンネルID → Webhook（None は利用不可としてEmbedで送信）
+        self._webhooks: Dict[int, Optional[discord.Webhook]] = {}
+
+        # 統計
+        self.relayed = 0
+        self.sent_messages = 0
+        self.sent_embeds = 0
+        self.dropped = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def relay(self, payload: RelayPayload, targets: Iterable[Tuple[int, int]]):
+        """送信内容を全転送先のキューに積む（送信完了は待たない）"""
+        enqueued_at = time.perf_counter()
+        for guild_id, channel_id in targets:
+            self._enqueue(channel_id, (payload, enqueued_at))
+        self.relayed += 1
+
+    def _enqueue(self, channel_id: int, item):
+        """転送先キューに追加（満杯なら最も古いものを破棄）"""
+        queue = self._queues.get(channel_id)
+        if queue is None:
+            queue = self._queues[channel_id] = asyncio.Queue(maxsize=self.queue_size)
+
+        if queue.full():
+            queue.get_nowait()
+            queue.task_done()
+            self.dropped += 1
+        queue.put_nowait(item)
+
+        worker = self._workers.get(channel_id)
+        if worker is None or worker.done():
+            self._workers[channel_id] = asyncio.create_task(self._worker(channel_id, queue))
+
+    async def _worker(self, channel_id: int, queue: asyncio.Queue):
+        """転送先チャンネルごとの送信ワーカー"""
+        while True:
+            item = self._carry.pop(channel_id, None)
+            if item is None:
+                item = await queue.get()
+
+            # 直前の送信から最小間隔を空ける（その間に届いたメッセージはまとめて送る）
+            wait = self._last_sent.get(channel_id, 0.0) + self.min_interval - time.perf_counter()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            # Embed数と合計文字数の上限まで1回の送信にまとめる（入りきらない分は次の送信へ）
+            batch = [item]
+            total_length = item[0].embed_length
+            while len(batch) < self.MAX_EMBEDS_PER_MESSAGE and not queue.empty():
+                next_item = queue.get_nowait()
+                total_length += next_item[0].embed_length
+                if total_length > self.MAX_EMBED_TOTAL_LENGTH:
+                    self._carry[channel_id] = next_item
+                    break
+                batch.append(next_item)
+
+            try:
+                await self._send(channel_id, batch)
+            except Exception as e:
+                # 想定外の失敗でもワーカーは止めない
+                self._record_failure(channel_id, batch, e)
+            finally:
+                self._last_sent[channel_id] = time.perf_counter()
+                for _ in batch:
+                    queue.task_done()
+
+    async def _send(self, channel_id: int, batch):
+        """まとめた送信内容を配送"""
+        channel = self.bot.get_channel(channel_id)
+        if channel is None:
+            self.failed += len(batch)
+            return
+
+        webhook = await self._get_webhook(channel) if self.use_webhooks else None
+        if webhook:
+            groups = self._group_by_author(batch)
+        else:
+            groups = [(None, batch)]
+
+        for content, group in groups:
+            try:
+                if webhook:
+                    try:
+                        messages = await self._send_webhook(webhook, content, group[0][0])
+                    except discord.HTTPException as e:
+                        if e.status == 429:
+                            raise
+                        if isinstance(e, discord.NotFound):
+                            # Webhookが削除されていた場合は次回作り直す
+                            self._webhooks.pop(channel_id, None)
+                        # Webhookで送れない内容（拒否される名前など）はEmbedで送り直す
+                        relay_logger.warning(f"Webhook送信に失敗したためEmbedで再送します (channel={channel_id}): {e}")
+                        messages = await self._send_embeds(channel, group)
+                else:
+                    messages = await self._send_embeds(channel, group)
+            except (discord.HTTPException, aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+                # 接続断・タイムアウトなどのネットワークエラーも送信失敗として数える
+                self._record_failure(channel_id, group, e)
+                continue
+
+            now = time.perf_counter()
+            for _, enqueued_at in group:
+                latency = now - enqueued_at
+                self.total_latency += latency
+                self.max_latency = max(self.max_latency, latency)
+            self.sent_messages += messages
+            self.sent_embeds += len(group)
+
+    async def _send_embeds(self, channel, group) -> int:
+        """Embedで1投稿として送信（送信したメッセージ数を返す）"""
+        await self._with_retry(channel.send, embeds=[payload.embed for payload, _ in group])
+        return 1
+
+    async def _send_webhook(self, webhook: discord.Webhook, content: str, payload: RelayPayload) -> int:
+        """Webhookで発言者として送信（文字数上限ごとに分割し、送信したメッセージ数を返す）"""
+        chunks = self._split_content(content)
+        for chunk in chunks:
+            await self._with_retry(
+                webhook.send,
+                content=chunk,
+                username=payload.username[:80],
+                avatar_url=payload.avatar_url,
+                allowed_mentions=discord.AllowedMentions.none()
+            )
+        return len(chunks)
+
+    def _split_content(self, content: str) -> List[str]:
+        """本文を1メッセージの文字数上限ごとに分割（できるだけ改行で区切る）"""
+        chunks = []
+        while len(content) > self.MAX_CONTENT_LENGTH:
+            cut = content.rfind('\n', 0, self.MAX_CONTENT_LENGTH + 1)
+            if cut <= 0:
+                cut = self.MAX_CONTENT_LENGTH
+            chunks.append(content[:cut])
+            content = content[cut:].lstrip('\n')
+        if content or not chunks:
+            chunks.append(content)
+        return chunks
+
+    async def _with_retry(self, send, **kwargs):
+        """送信（discord.py がレート制限バケットを処理しきれなかった場合のみ1回だけ再試行）"""
+        try:
+            await send(**kwargs)
+        except discord.HTTPException as e:
+            if e.status != 429:
+                raise
+            await asyncio.sleep(getattr(e, 'retry_after', self.min_interval))
+            await send(**kwargs)
+
+    def _group_by_author(self, batch) -> List[Tuple[str, list]]:
+        """同じ発言者の連続メッセージを1投稿にまとめる（文字数上限まで）"""
+        groups = []
+        for item in batch:
+            payload = item[0]
+            if groups:
+                content, group = groups[-1]
+                last = group[-1][0]
+                merged = f"{content}\n{payload.content}"
+                if (last.username, last.avatar_url) == (payload.username, payload.avatar_url) \
+                        and len(merged) <= self.MAX_CONTENT_LENGTH:
+                    group.append(item)
+                    groups[-1] = (merged, group)
+                    continue
+            groups.append((payload.content, [item]))
+        return groups
+
+    async def _get_webhook(self, channel) -> Optional[discord.Webhook]:
+        """転送先チャンネルの中継用Webhookを取得（なければ作成してキャッシュ）"""
+        if channel.id in self._webhooks:
+            return self._webhooks[channel.id]
+
+        webhook = None
+        try:
+            for existing in await channel.webhooks():
+                if existing.name == self.WEBHOOK_NAME and existing.user and existing.user.id == self.bot.user.id:
+                    webhook = existing
+                    break
+            if webhook is None:
+                webhook = await channel.create_webhook(name=self.WEBHOOK_NAME)
+        except (discord.Forbidden, discord.HTTPException, AttributeError) as e:
+            relay_logger.warning(f"Webhookを利用できないためEmbedで送信します (channel={channel.id}): {e}")
+
+        self._webhooks[channel.id] = webhook
+        return webhook
+
+    def _record_failure(self, channel_id: int, batch, error: Exception):
+        """送信失敗を記録"""
+        self.failed += len(batch)
+        relay_logger.warning(f"グローバルチャット転送失敗 (channel={channel_id}): {error}")
+
+    def discard(self, channel_id: Optional[int]):
+        """転送先チャンネルのキューとワーカーを破棄"""
+        if channel_id is None:
+            return
+        worker = self._workers.pop(channel_id, None)
+        if worker:
+            worker.cancel()
+        queue = self._queues.pop(channel_id, None)
+        if queue:
+            self.dropped += queue.qsize()
+        self._last_sent.pop(channel_id, None)
+        self._webhooks.pop(channel_id, None)
+        if self._carry.pop(channel_id, None):
+            self.dropped += 1
+
+    async def close(self):
+        """全ワーカーを停止"""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
+        self._carry.clear()
+
+    def get_stats(self) -> Dict:
+        """中継の統計を取得"""
+        depths = [queue.qsize() for queue in self._queues.values()]
+        return {
+            'delivery': 'webhook' if self.use_webhooks else 'embed',
+            'webhooks': sum(1 for webhook in self._webhooks.values() if webhook),
+            'destinations': len(self._queues),
+            'queue_depth': sum(depths),
+            'max_queue_depth': max(depths, default=0),
+            'relayed': self.relayed,
+            'sent_messages': self.sent_messages,
+            'sent_embeds': self.sent_embeds,
+            'dropped': self.dropped,
+            'failed': self.failed,
+            'avg_latency_ms': self.total_latency / self.sent_embeds * 1000 if self.sent_embeds else 0.0,
+            'max_latency_ms': self.max_latency * 1000,
+        }
+
+def create_relay(bot) -> GlobalChatRelay:
+    """設定ファイルの GLOBAL_CHAT_CONFIG から中継エンジンを作成"""
+    relay_config = getattr(config, 'GLOBAL_CHAT_CONFIG', {})
+    return GlobalChatRelay(
+        bot,
+        queue_size=relay_config.get('queue_size', 100),
+        min_interval=relay_config.get('min_interval', 1.0),
+        use_webhooks=relay_config.get('delivery', 'embed') == 'webhook'
+    )
@@ -0,0 +1,190 @@
+# Guild Settings Cache
+import logging
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from database import db_manager
+
+# ログ設定
+settings_logger = logging.getLogger('guild_settings')
+
+class GuildSettingsCache:
+    """guild_settings テーブルのプロセス全体キャッシュ
+
+    起動時に全ギルド分を読み込み、以降の参照はメモリのみで完結する。
+    設定の変更は update() 経由で行い、DBへ書き込んだ後にキャッシュとグローバルチャットのインデックスへ反映する。
+    """
+
+    # キャッシュ対象のカラムとデフォルト値
+    DEFAULTS = {
+        'chinese_channel_id': None,
+        'chinese_locked': False,
+        'chinese_dictionary': None,
+        'global_chat_channel_id': None,
+        'auto_read_channel_id': None,
+        'auto_read_enabled': False,
+        'log_channel_id': None,
+    }
+    # 未設定のギルドに返す読み取り専用のデフォルト（設定済みのギルドにも読み取り専用のビューを返す）
+    _DEFAULTS_VIEW = MappingProxyType(DEFAULTS)
+
+    def __init__(self):
+        self._settings: Dict[int, Dict] = {}
+        self._loaded = False
+        self.hits = 0
+        self.misses = 0
+
+    def is_loaded(self) -> bool:
+        """全ギルド分の読み込みが完了しているか"""
+        return self._loaded
+
+    async def load(self):
+        """全ギルドの設定をDBから読み込む"""
+        columns = ", ".join(self.DEFAULTS)
+        async with db_manager.reader() as db:
+            cursor = await db.execute(f'SELECT guild_id, {columns} FROM guild_settings')
+            rows = await cursor.fetchall()
+
+        self._settings = {row[0]: self._row_to_dict(row[1:]) for row in rows}
+        self._loaded = True
+        global_chat_index.rebuild(
+            (guild_id, settings['global_chat_channel_id'])
+            for guild_id, settings in self._settings.items()
+        )
+        settings_logger.info(f"Guild settings cache loaded: {len(self._settings)} guilds")
+
+    def _row_to_dict(self, values) -> Dict:
+        """SELECT結果をカラム名付きの辞書に変換"""
+        settings = dict(zip(self.DEFAULTS, values))
+        settings['chinese_locked'] = bool(settings['chinese_locked'])
+        settings['auto_read_enabled'] = bool(settings['auto_read_enabled'])
+        return settings
+
+    async def get(self, guild_id: int) -> Mapping:
+        """ギルド設定を読み取り専用で取得（読み込み済みならI/Oなし）"""
+        settings = self._settings.get(guild_id)
+        if settings is not None or self._loaded:
+            self.hits += 1
+            return MappingProxyType(settings) if settings is not None else self._DEFAULTS_VIEW
+
+        # 起動直後など未読み込みの場合のみDBを参照
+        self.misses += 1
+        columns = ", ".join(self.DEFAULTS)
+        async with db_manager.reader() as db:
+            cursor = await db.execute(
+                f'SELECT {columns} FROM guild_settings WHERE guild_id = ?', (guild_id,)
+            )
+            row = await cursor.fetchone()
+
+        if row is None:
+            return self._DEFAULTS_VIEW
+        settings = self._row_to_dict(row)
+        self._settings[guild_id] = settings
+        return MappingProxyType(settings)
+
+    def peek(self, guild_id: int) -> Optional[Dict]:
+        """キャッシュ済みの設定のコピーを返す（統計に含めない）"""
+        settings = self._settings.get(guild_id)
+        return dict(settings) if settings is not None else None
+
+    def all(self) -> Dict[int, Dict]:
+        """キャッシュ済みの全ギルド設定のコピー"""
+        return {guild_id: dict(settings) for guild_id, settings in self._settings.items()}
+
+    async def update(self, guild_id: int, **values):
+        """設定を更新（DBへ書き込んでからキャッシュに反映）"""
+        unknown = set(values) - set(self.DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown guild setting(s): {', '.join(sorted(unknown))}")
+
+        columns = list(values)
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in columns)
+        async with db_manager.writer() as db:
+            await db.execute(f'''
+                INSERT INTO guild_settings (guild_id, {", ".join(columns)})
+                VALUES (?, {", ".join("?" for _ in columns)})
+                ON CONFLICT(guild_id) DO UPDATE SET {assignments}, updated_at = CURRENT_TIMESTAMP
+            ''', (guild_id, *values.values()))
+
+        # グローバルチャットのインデックスはキャッシュの読み込み状態に関係なく追従させる
+        if 'global_chat_channel_id' in values:
+            global_chat_index.set(guild_id, values['global_chat_channel_id'])
+
+        # 未読み込みのギルドは次回 get() でDBから読み直す
+        if not self._loaded and guild_id not in self._settings:
+            return
+
+        # コミット後にキャッシュを更新（既存の値はコピーして差し替える）
+        settings = dict(self._settings.get(guild_id, self.DEFAULTS))
+        settings.update(values)
+        settings['chinese_locked'] = bool(settings['chinese_locked'])
+        settings['auto_read_enabled'] = bool(settings['auto_read_enabled'])
+        self._settings[guild_id] = settings
+
+    def get_stats(self) -> Dict:
+        """キャッシュの統計を取得"""
+        total = self.hits + self.misses
+        return {
+            'loaded': self._loaded,
+            'guilds': len(self._settings),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total * 100, 2) if total else 0.0,
+        }
+
+class GlobalChatIndex:
+    """グローバルチャットチャンネルの双方向インデックス
+
+    チャンネルID → ギルドID と、ギルドID → チャンネルID を保持し、
+    各チャンネルの転送先（発信元を除く全チャンネル）を事前に計算しておく。
+    """
+
+    def __init__(self):
+        self._channel_to_guild: Dict[int, int] = {}
+        self._guild_to_channel: Dict[int, int] = {}
+        self._targets: Dict[int, Tuple[Tuple[int, int], ...]] = {}
+
+    def rebuild(self, entries):
+        """(guild_id, channel_id) の組からインデックスを作り直す"""
+        self._guild_to_channel = {
+            guild_id: channel_id for guild_id, channel_id in entries if channel_id
+        }
+        self._refresh()
+
+    def set(self, guild_id: int, channel_id: Optional[int]):
+        """ギルドのグローバルチャットチャンネルを設定（None で解除）"""
+        if channel_id:
+            self._guild_to_channel[guild_id] = channel_id
+        else:
+            self._guild_to_channel.pop(guild_id, None)
+        self._refresh()
+
+    def _refresh(self):
+        """逆引きと転送先リストを再計算"""
+        self._channel_to_guild = {
+            channel_id: guild_id for guild_id, channel_id in self._guild_to_channel.items()
+        }
+        entries = tuple(self._guild_to_channel.items())
+        self._targets = {
+            channel_id: tuple(entry for entry in entries if entry[0] != guild_id)
+            for guild_id, channel_id in entries
+        }
+
+    def guild_for(self, channel_id: int) -> Optional[int]:
+        """チャンネルが属するギルドID（グローバルチャットでなければ None）"""
+        return self._channel_to_guild.get(channel_id)
+
+    def channel_for(self, guild_id: int) -> Optional[int]:
+        """ギルドのグローバルチャットチャンネルID"""
+        return self._guild_to_channel.get(guild_id)
+
+    def targets_for(self, channel_id: int) -> Tuple[Tuple[int, int], ...]:
+        """転送先の (guild_id, channel_id) 一覧（発信元ギルドを除く）"""
+        return self._targets.get(channel_id, ())
+
+    def __len__(self) -> int:
+        return len(self._guild_to_channel)
+
+# グローバルインスタンス
+guild_settings_cache = GuildSettingsCache()
+global_chat_index = GlobalChatIndex()
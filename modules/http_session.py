@@ -0,0 +1,82 @@
+"""
+RTKS Discord Bot - 共有HTTPセッションモジュール
+VOICEVOX などの外部APIに使う aiohttp セッションをボット全体で共有する
+"""
+
+import asyncio
+import aiohttp
+import logging
+from typing import Dict, Optional
+
+try:
+    import config
+except ImportError:
+    config = None
+
+# ログ設定
+http_logger = logging.getLogger('http_session')
+
+class SharedHTTPSession:
+    """ボット全体で共有する aiohttp.ClientSession
+
+    初回利用時にセッションを作成し、keep-alive 付きの上限あり
+    コネクタを使い回す。close() はボット終了時に1回呼ぶ。
+    """
+
+    def __init__(self, limit: int = 16, limit_per_host: int = 8, keepalive_timeout: float = 30.0,
+                 total_timeout: float = 30.0, connect_timeout: float = 5.0, read_timeout: float = 20.0):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = aiohttp.ClientTimeout(
+            total=total_timeout,
+            connect=connect_timeout,
+            sock_read=read_timeout
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self.requests = 0
+
+    async def get(self) -> aiohttp.ClientSession:
+        """共有セッションを取得（未作成または閉じられていれば作成）"""
+        if self._session is not None and not self._session.closed:
+            self.requests += 1
+            return self._session
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout
+                )
+                self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+                http_logger.info("Shared HTTP session created")
+        self.requests += 1
+        return self._session
+
+    async def close(self):
+        """セッションを閉じる"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            http_logger.info("Shared HTTP session closed")
+        self._session = None
+
+    def get_stats(self) -> Dict:
+        """セッションの統計を取得"""
+        return {
+            'open': self._session is not None and not self._session.closed,
+            'requests': self.requests,
+            'limit': self.limit,
+            'limit_per_host': self.limit_per_host,
+        }
+
+def create_voicevox_session() -> SharedHTTPSession:
+    """設定ファイルの VOICEVOX_CONFIG から VOICEVOX 用セッションを作成"""
+    voicevox_config = getattr(config, 'VOICEVOX_CONFIG', {})
+    return SharedHTTPSession(**voicevox_config.get('http', {}))
+
+# グローバルインスタンス
+voicevox_session = create_voicevox_session()
@@ -34,14 +34,12 @@ class IntroductionCog(commands.Cog):
                 await interaction.response.send_message("❌ データベースが利用できません。", ephemeral=True)
                 return
             
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 await db.execute('''
                     INSERT OR REPLACE INTO intro_settings 
                     (guild_id, intro_channel_id, secret_role_name, is_enabled)
                     VALUES (?, ?, ?, 1)
                 ''', (interaction.guild.id, intro_channel.id, secret_role))
-                await db.commit()
             
             embed = discord.Embed(
                 title="🎭 自己紹介システム設定完了",
@@ -75,24 +73,23 @@ class IntroductionCog(commands.Cog):
                 await interaction.response.send_message("❌ データベースが利用できません。", ephemeral=True)
                 return
             
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 # 現在の状態を取得
                 cursor = await db.execute('''
                     SELECT is_enabled FROM intro_settings WHERE guild_id = ?
                 ''', (interaction.guild.id,))
                 result = await cursor.fetchone()
                 
-                if not result:
-                    await interaction.response.send_message("❌ 自己紹介システムが設定されていません。先に `/setup_intro` を実行してください。", ephemeral=True)
-                    return
-                
-                # 状態を切り替え
-                new_status = not result[0]
-                await db.execute('''
-                    UPDATE intro_settings SET is_enabled = ? WHERE guild_id = ?
-                ''', (new_status, interaction.guild.id))
-                await db.commit()
+                if result:
+                    # 状態を切り替え
+                    new_status = not result[0]
+                    await db.execute('''
+                        UPDATE intro_settings SET is_enabled = ? WHERE guild_id = ?
+                    ''', (new_status, interaction.guild.id))
+            
+            if not result:
+                await interaction.response.send_message("❌ 自己紹介システムが設定されていません。先に `/setup_intro` を実行してください。", ephemeral=True)
+                return
             
             status_text = "有効" if new_status else "無効"
             embed = discord.Embed(
@@ -122,8 +119,7 @@ class IntroductionCog(commands.Cog):
                 await interaction.response.send_message("❌ 自己紹介は1000文字以内で入力してください。", ephemeral=True)
                 return
             
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 # 自己紹介システムが有効かチェック
                 cursor = await db.execute('''
                     SELECT intro_channel_id FROM intro_settings 
@@ -131,17 +127,17 @@ class IntroductionCog(commands.Cog):
                 ''', (interaction.guild.id,))
                 setting = await cursor.fetchone()
                 
-                if not setting:
-                    await interaction.response.send_message("❌ 自己紹介システムが有効ではありません。", ephemeral=True)
-                    return
-                
-                # データベースに保存
-                await db.execute('''
-                    INSERT OR REPLACE INTO user_introductions 
-                    (guild_id, user_id, introduction_text, intro_channel_id)
-                    VALUES (?, ?, ?, ?)
-                ''', (interaction.guild.id, interaction.user.id, introduction, setting[0]))
-                await db.commit()
+                if setting:
+                    # データベースに保存
+                    await db.execute('''
+                        INSERT OR REPLACE INTO user_introductions 
+                        (guild_id, user_id, introduction_text, intro_channel_id)
+                        VALUES (?, ?, ?, ?)
+                    ''', (interaction.guild.id, interaction.user.id, introduction, setting[0]))
+            
+            if not setting:
+                await interaction.response.send_message("❌ 自己紹介システムが有効ではありません。", ephemeral=True)
+                return
             
             embed = discord.Embed(
                 title="🎭 自己紹介設定完了",
@@ -166,27 +162,26 @@ class IntroductionCog(commands.Cog):
                 await interaction.response.send_message("❌ データベースが利用できません。", ephemeral=True)
                 return
             
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT intro_channel_id, secret_role_name, is_enabled 
                     FROM intro_settings WHERE guild_id = ?
                 ''', (interaction.guild.id,))
                 setting = await cursor.fetchone()
                 
-                if not setting:
-                    await interaction.response.send_message("❌ 自己紹介システムが設定されていません。", ephemeral=True)
-                    return
-                
-                intro_channel_id, secret_role_name, is_enabled = setting
-                intro_channel = self.bot.get_channel(intro_channel_id)
-                
                 # 登録済み自己紹介数を取得
                 cursor = await db.execute('''
                     SELECT COUNT(*) FROM user_introductions WHERE guild_id = ?
                 ''', (interaction.guild.id,))
                 intro_count = (await cursor.fetchone())[0]
             
+            if not setting:
+                await interaction.response.send_message("❌ 自己紹介システムが設定されていません。", ephemeral=True)
+                return
+            
+            intro_channel_id, secret_role_name, is_enabled = setting
+            intro_channel = self.bot.get_channel(intro_channel_id)
+            
             embed = discord.Embed(
                 title="🎭 自己紹介システム状況",
                 color=0x00ff00 if is_enabled else 0xff9900,
@@ -229,32 +224,31 @@ class IntroductionCog(commands.Cog):
                 return
 
             guild = member.guild
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 # 自己紹介システム設定を取得
                 cursor = await db.execute('''
                     SELECT intro_channel_id, secret_role_name, is_enabled 
                     FROM intro_settings WHERE guild_id = ?
                 ''', (guild.id,))
                 setting = await cursor.fetchone()
-                
-                if not setting or not setting[2]:  # システムが無効
-                    return
-                
-                intro_channel_id, secret_role_name, _ = setting
-                intro_channel = self.bot.get_channel(intro_channel_id)
-                
-                if not intro_channel:
-                    return
+            
+            if not setting or not setting[2]:  # システムが無効
+                return
+            
+            intro_channel_id, secret_role_name, _ = setting
+            intro_channel = self.bot.get_channel(intro_channel_id)
+            
+            if not intro_channel:
+                return
 
-                # 除外ロールをチェック
-                if discord.utils.get(member.roles, name=secret_role_name):
-                    return
+            # 除外ロールをチェック
+            if discord.utils.get(member.roles, name=secret_role_name):
+                return
 
-                # 自己紹介を取得
-                introduction = await self._fetch_introduction(member, guild.id)
-                if introduction:
-                    await self._send_introduction_embed(intro_channel, member, channel, introduction, "参加")
+            # 自己紹介を取得
+            introduction = await self._fetch_introduction(member, guild.id)
+            if introduction:
+                await self._send_introduction_embed(intro_channel, member, channel, introduction, "参加")
 
         except Exception as e:
             intro_logger.error(f"ボイス参加処理エラー: {e}")
@@ -267,32 +261,31 @@ class IntroductionCog(commands.Cog):
                 return
 
             guild = member.guild
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 # 自己紹介システム設定を取得
                 cursor = await db.execute('''
                     SELECT intro_channel_id, secret_role_name, is_enabled 
                     FROM intro_settings WHERE guild_id = ?
                 ''', (guild.id,))
                 setting = await cursor.fetchone()
-                
-                if not setting or not setting[2]:  # システムが無効
-                    return
-                
-                intro_channel_id, secret_role_name, _ = setting
-                intro_channel = self.bot.get_channel(intro_channel_id)
-                
-                if not intro_channel:
-                    return
+            
+            if not setting or not setting[2]:  # システムが無効
+                return
+            
+            intro_channel_id, secret_role_name, _ = setting
+            intro_channel = self.bot.get_channel(intro_channel_id)
+            
+            if not intro_channel:
+                return
 
-                # 除外ロールをチェック
-                if discord.utils.get(member.roles, name=secret_role_name):
-                    return
+            # 除外ロールをチェック
+            if discord.utils.get(member.roles, name=secret_role_name):
+                return
 
-                # 自己紹介を取得
-                introduction = await self._fetch_introduction(member, guild.id)
-                if introduction:
-                    await self._send_introduction_embed(intro_channel, member, channel, introduction, "退出")
+            # 自己紹介を取得
+            introduction = await self._fetch_introduction(member, guild.id)
+            if introduction:
+                await self._send_introduction_embed(intro_channel, member, channel, introduction, "退出")
 
         except Exception as e:
             intro_logger.error(f"ボイス退出処理エラー: {e}")
@@ -301,9 +294,7 @@ class IntroductionCog(commands.Cog):
         """データベースから自己紹介を取得"""
         try:
             from database import db_manager
-            import aiosqlite
-            
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT introduction_text FROM user_introductions 
                     WHERE guild_id = ? AND user_id = ?
@@ -9,14 +9,26 @@ from discord import app_commands
 import asyncio
 import yt_dlp
 import tempfile
+import io
 import os
 import aiohttp
 import aiofiles
 import random
 import logging
+import wave
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Optional, Dict, Any
 
+from modules.http_session import voicevox_session
+from modules.tts_cache import TTSCache, normalize_text
+
+try:
+    import config
+except ImportError:
+    config = None
+
 # ログ設定
 music_logger = logging.getLogger('music')
 
@@ -91,89 +103,270 @@ class MusicQueue:
     def is_empty(self):
         return len(self.queue) == 0
 
+# Discord 音声の送信形式
+DISCORD_SAMPLE_RATE = 48000
+DISCORD_CHANNELS = 2
+DISCORD_SAMPLE_WIDTH = 2
+DISCORD_FRAME_SIZE = 3840  # 20ms 分のPCM（48000Hz × 2ch × 2byte × 0.02s）
+
+def wav_to_discord_pcm(audio: bytes) -> Optional[bytes]:
+    """Discord の送信形式そのままのWAVなら、フレーム境界まで無音で埋めたPCMを返す（それ以外は None）"""
+    try:
+        with wave.open(io.BytesIO(audio), 'rb') as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != \
+                    (DISCORD_SAMPLE_RATE, DISCORD_CHANNELS, DISCORD_SAMPLE_WIDTH):
+                return None
+            pcm = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    # PCMAudio は最後の半端なフレームを捨てるため無音で埋める
+    remainder = len(pcm) % DISCORD_FRAME_SIZE
+    if remainder:
+        pcm += b'\x00' * (DISCORD_FRAME_SIZE - remainder)
+    return pcm
+
 class VoiceSynthesizer:
-    def __init__(self):
-        self.voicevox_url = "http://localhost:50021"  # VOICEVOXのデフォルトURL
+    """VOICEVOX音声合成（ボットごとに1つだけ作成して共有する）"""
+
+    def __init__(self, cleanup_interval: float = 600, max_file_age: float = 3600, cache_config: Optional[Dict] = None,
+                 query_cache_size: int = 512, debug_files: bool = False):
+        self.voicevox_url = getattr(config, 'VOICEVOX_URL', "http://localhost:50021")  # VOICEVOXのデフォルトURL
         # 専用のサブフォルダを作成して整理
         self.temp_dir = os.path.join(tempfile.gettempdir(), "discord_bot_voice")
         os.makedirs(self.temp_dir, exist_ok=True)
-        # 起動時に古いファイルをクリーンアップ
-        self.cleanup_old_files()
+        # 通常はメモリ上で再生し、debug_files 有効時のみ一時WAVファイルを書き出す
+        self.debug_files = debug_files
+        # 古いファイルのクリーンアップはバックグラウンドタスクで定期実行
+        self.cleanup_interval = cleanup_interval
+        self.max_file_age = max_file_age
+        self._cleanup_task: Optional[asyncio.Task] = None
+        # 合成済み音声のキャッシュ（一時ファイルのクリーンアップ対象外のサブフォルダに保存）
+        cache_config = dict(cache_config or {})
+        cache_dir = cache_config.pop('directory', None) or os.path.join(self.temp_dir, "cache")
+        self.cache = TTSCache(cache_dir, **cache_config)
+        # 同じキーの合成が同時に走らないよう、合成中のものを共有
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # audio_query の結果は (テキスト, 話者) だけで決まるためLRUで保持
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[tuple, Dict]" = OrderedDict()
+        self.query_hits = 0
+        self.query_misses = 0
         
     def cleanup_old_files(self):
-        """1時間以上古い一時ファイルを削除"""
+        """max_file_age 秒以上古い一時ファイルを削除（ブロッキング処理のためスレッドで実行する）"""
+        removed = 0
         try:
-            import time
             current_time = time.time()
-            for filename in os.listdir(self.temp_dir):
-                file_path = os.path.join(self.temp_dir, filename)
-                if os.path.isfile(file_path):
-                    file_age = current_time - os.path.getmtime(file_path)
-                    if file_age > 3600:  # 1時間 = 3600秒
-                        os.remove(file_path)
+            with os.scandir(self.temp_dir) as entries:
+                for entry in entries:
+                    if entry.is_file() and current_time - entry.stat().st_mtime > self.max_file_age:
+                        os.remove(entry.path)
+                        removed += 1
         except Exception as e:
             music_logger.error(f"古いファイルのクリーンアップに失敗: {e}")
+        return removed
+
+    def start_cleanup_task(self):
+        """定期クリーンアップタスクを開始（一時ファイルを書き出さない場合と実行中なら何もしない）"""
+        if not self.debug_files:
+            return
+        if self._cleanup_task is None or self._cleanup_task.done():
+            self._cleanup_task = asyncio.get_running_loop().create_task(self._cleanup_loop())
+
+    async def _cleanup_loop(self):
+        """イベントループを止めないよう、クリーンアップをスレッドプールで定期実行"""
+        loop = asyncio.get_running_loop()
+        while True:
+            removed = await loop.run_in_executor(None, self.cleanup_old_files)
+            if removed:
+                music_logger.info(f"古い音声ファイルを削除しました: {removed}件")
+            await asyncio.sleep(self.cleanup_interval)
+
+    async def close(self):
+        """定期クリーンアップタスクを停止"""
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            try:
+                await self._cleanup_task
+            except asyncio.CancelledError:
+                pass
+            self._cleanup_task = None
 
     async def check_voicevox_connection(self):
         """VOICEVOXサーバーとの接続確認"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.voicevox_url}/speakers", timeout=5) as response:
-                    return response.status == 200
+            session = await voicevox_session.get()
+            async with session.get(f"{self.voicevox_url}/speakers", timeout=aiohttp.ClientTimeout(total=5)) as response:
+                return response.status == 200
         except:
             return False
 
     async def get_voicevox_speakers(self):
         """VOICEVOX話者一覧を取得"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.voicevox_url}/speakers") as response:
-                    if response.status == 200:
-                        return await response.json()
+            session = await voicevox_session.get()
+            async with session.get(f"{self.voicevox_url}/speakers") as response:
+                if response.status == 200:
+                    return await response.json()
         except Exception as e:
             music_logger.error(f"VOICEVOX話者取得エラー: {e}")
         return []
 
-    async def generate_voice_voicevox(self, text: str, speaker_id: int = 3):
-        """VOICEVOXで音声生成"""
+    async def synthesize(self, text: str, speaker_id: int = 3, speed: float = 1.0,
+                         pitch: float = 0.0, volume: float = 1.0) -> Optional[bytes]:
+        """音声を合成してWAVデータを返す（キャッシュ済みなら VOICEVOX を呼ばない）"""
+        text = normalize_text(text)
+        if not text:
+            return None
+
+        key = self.cache.make_key(text, speaker_id, speed, pitch, volume)
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        # 同じキーの後続リクエストはこの結果を待つ
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        audio_data = None
         try:
-            # ステップ1: 音声クエリ生成
-            async with aiohttp.ClientSession() as session:
-                query_params = {"text": text, "speaker": speaker_id}
-                async with session.post(f"{self.voicevox_url}/audio_query", params=query_params) as response:
-                    if response.status != 200:
-                        return None
-                    query_data = await response.json()
-
-                # ステップ2: 音声合成
-                headers = {"Content-Type": "application/json"}
-                synthesis_params = {"speaker": speaker_id}
-                async with session.post(
-                    f"{self.voicevox_url}/synthesis",
-                    params=synthesis_params,
-                    json=query_data,
-                    headers=headers
-                ) as response:
-                    if response.status != 200:
-                        return None
-                    
-                    # 音声ファイルを保存
-                    audio_data = await response.read()
-                    temp_file = os.path.join(self.temp_dir, f"voice_{int(datetime.now().timestamp())}.wav")
-                    
-                    async with aiofiles.open(temp_file, 'wb') as f:
-                        await f.write(audio_data)
-                    
-                    return temp_file
+            audio_data = await self.cache.get(key)
+            if audio_data is None:
+                audio_data = await self._synthesize_voicevox(text, speaker_id, speed, pitch, volume)
+                if audio_data:
+                    await self.cache.put(key, audio_data)
+            return audio_data
+        finally:
+            del self._inflight[key]
+            future.set_result(audio_data)
+
+    async def _synthesize_voicevox(self, text: str, speaker_id: int, speed: float,
+                                   pitch: float, volume: float) -> Optional[bytes]:
+        """VOICEVOXの audio_query と synthesis を呼び出す"""
+        try:
+            # ステップ1: 音声クエリ生成（キャッシュ済みなら再利用）
+            session = await voicevox_session.get()
+            cached_query = await self._get_audio_query(session, text, speaker_id)
+            if cached_query is None:
+                return None
+
+            # ユーザーごとの音声設定はキャッシュしたクエリのコピーに反映
+            query_data = dict(cached_query)
+            query_data["speedScale"] = speed
+            query_data["pitchScale"] = pitch
+            query_data["volumeScale"] = volume
+            # Discord の送信形式（48kHz・ステレオ・16bit）で出力させ、FFmpeg での変換を不要にする
+            query_data["outputSamplingRate"] = DISCORD_SAMPLE_RATE
+            query_data["outputStereo"] = True
+
+            # ステップ2: 音声合成
+            headers = {"Content-Type": "application/json"}
+            synthesis_params = {"speaker": speaker_id}
+            async with session.post(
+                f"{self.voicevox_url}/synthesis",
+                params=synthesis_params,
+                json=query_data,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    return None
+                return await response.read()
         except Exception as e:
             music_logger.error(f"VOICEVOX音声生成エラー: {e}")
         return None
 
+    async def _get_audio_query(self, session, text: str, speaker_id: int) -> Optional[Dict]:
+        """audio_query の結果を取得（LRUキャッシュ、返り値は変更しないこと）"""
+        key = (text, speaker_id)
+        query_data = self._query_cache.get(key)
+        if query_data is not None:
+            self._query_cache.move_to_end(key)
+            self.query_hits += 1
+            return query_data
+
+        self.query_misses += 1
+        query_params = {"text": text, "speaker": speaker_id}
+        async with session.post(f"{self.voicevox_url}/audio_query", params=query_params) as response:
+            if response.status != 200:
+                return None
+            query_data = await response.json()
+
+        self._query_cache[key] = query_data
+        while len(self._query_cache) > self.query_cache_size:
+            self._query_cache.popitem(last=False)
+        return query_data
+
+    def get_query_cache_stats(self) -> Dict:
+        """audio_query キャッシュの統計を取得"""
+        total = self.query_hits + self.query_misses
+        return {
+            'entries': len(self._query_cache),
+            'hits': self.query_hits,
+            'misses': self.query_misses,
+            'hit_rate': round(self.query_hits / total * 100, 2) if total else 0.0,
+        }
+
+    async def prepare_speech(self, text: str, speaker_id: int = 3, speed: float = 1.0,
+                             pitch: float = 0.0, volume: float = 1.0):
+        """再生用の音声を用意（通常はWAVデータ、debug_files 有効時は一時ファイルのパス）"""
+        if self.debug_files:
+            return await self.generate_voice_voicevox(text, speaker_id, speed, pitch, volume)
+        return await self.synthesize(text, speaker_id, speed, pitch, volume)
+
+    @staticmethod
+    def create_audio_source(audio) -> discord.AudioSource:
+        """prepare_speech の結果から再生用のオーディオソースを作成
+
+        48kHz・ステレオ・16bit のWAVは PCMAudio でそのまま送るため、FFmpeg のプロセスを起動しない。
+        それ以外の形式のみ FFmpeg で変換する。
+        """
+        if isinstance(audio, bytes):
+            pcm = wav_to_discord_pcm(audio)
+            if pcm is not None:
+                return discord.PCMAudio(io.BytesIO(pcm))
+            # WAVデータを FFmpeg の標準入力へ直接流し込む
+            return discord.FFmpegPCMAudio(io.BytesIO(audio), pipe=True)
+        return discord.FFmpegPCMAudio(audio)
+
+    async def generate_voice_voicevox(self, text: str, speaker_id: int = 3, speed: float = 1.0,
+                                      pitch: float = 0.0, volume: float = 1.0):
+        """VOICEVOXで音声生成して一時ファイルのパスを返す（デバッグ用）"""
+        try:
+            audio_data = await self.synthesize(text, speaker_id, speed, pitch, volume)
+            if not audio_data:
+                return None
+
+            # 音声ファイルを保存
+            temp_file = os.path.join(self.temp_dir, f"voice_{time.time_ns()}.wav")
+            async with aiofiles.open(temp_file, 'wb') as f:
+                await f.write(audio_data)
+            
+            return temp_file
+        except Exception as e:
+            music_logger.error(f"VOICEVOX音声生成エラー: {e}")
+        return None
+
+def get_voice_synthesizer(bot) -> VoiceSynthesizer:
+    """ボットが所有する共有 VoiceSynthesizer を取得（初回のみ作成してクリーンアップを開始）"""
+    synthesizer = getattr(bot, 'voice_synthesizer', None)
+    if synthesizer is None:
+        voicevox_config = getattr(config, 'VOICEVOX_CONFIG', {})
+        synthesizer = VoiceSynthesizer(
+            cleanup_interval=voicevox_config.get('cleanup_interval', 600),
+            max_file_age=voicevox_config.get('max_file_age', 3600),
+            cache_config=voicevox_config.get('cache'),
+            query_cache_size=voicevox_config.get('query_cache_size', 512),
+            debug_files=voicevox_config.get('debug_write_files', False)
+        )
+        bot.voice_synthesizer = synthesizer
+    synthesizer.start_cleanup_task()
+    return synthesizer
+
 class MusicCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.music_queues: Dict[int, MusicQueue] = {}
-        self.voice_synthesizer = VoiceSynthesizer()
+        self.voice_synthesizer = get_voice_synthesizer(bot)
         
     def get_music_queue(self, guild_id: int) -> MusicQueue:
         """サーバー専用の音楽キューを取得"""
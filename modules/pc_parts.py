@@ -1,14 +1,80 @@
 # PC Parts Data for Enhanced Mining System
 import random
-from typing import Dict, List, Tuple
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+class AliasSampler:
+    """Vose のエイリアス法による重み付き抽選
+    
+    テーブルの構築は O(n) で1回だけ行い、1回の抽選は乱数1個と比較1回の O(1)。
+    rng に random.Random を渡すと抽選結果を再現できる。
+    """
+    
+    __slots__ = ('items', '_prob', '_alias')
+    
+    def __init__(self, items: Sequence, weights: Sequence[float]):
+        n = len(items)
+        if n == 0 or n != len(weights):
+            raise ValueError("items and weights must be non-empty and of equal length")
+        total = float(sum(weights))
+        if total <= 0 or min(weights) < 0:
+            raise ValueError("weights must be non-negative with a positive total")
+        
+        self.items = tuple(items)
+        self._prob = [0.0] * n
+        self._alias = [0] * n
+        
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 残りは浮動小数点誤差を除いて確率1
+        for i in small + large:
+            self._prob[i] = 1.0
+            self._alias[i] = i
+    
+    def sample(self, rng: Optional[random.Random] = None):
+        """1個抽選"""
+        u = (rng or random).random() * len(self._prob)
+        i = int(u)
+        return self.items[i if u - i < self._prob[i] else self._alias[i]]
+    
+    def sample_k(self, k: int, rng: Optional[random.Random] = None) -> List:
+        """k個抽選（重複あり）"""
+        draw = (rng or random).random
+        n = len(self._prob)
+        items, prob, alias = self.items, self._prob, self._alias
+        results = []
+        for _ in range(k):
+            u = draw() * n
+            i = int(u)
+            results.append(items[i if u - i < prob[i] else alias[i]])
+        return results
+
+class CompiledBuild(NamedTuple):
+    """PC構成の性能をまとめて計算した結果（構成を保存するときに1回だけ作る）"""
+    hash_rate: int
+    power: int
+    efficiency: float
+    is_valid: bool
+    message: str
 
 class PCPartsData:
     """実際のPCパーツデータベース"""
     
+    # 各パーツの "id" は保存データが参照する固定IDのため、変更・再利用しないこと
+    # （種類ごとに GPU 1xx / CPU 2xx / マザーボード 3xx / 電源 4xx）
+    
     # GPUデータ（実際の製品）
     GPUS = {
         # NVIDIA RTX 40シリーズ
         "RTX 4090": {
+            "id": 101,
             "hash_rate": 120,  # MH/s (仮想)
             "power": 450,      # W
             "price": 2000000,  # 仮想通貨
@@ -18,6 +84,7 @@ class PCPartsData:
             "memory": "24GB GDDR6X"
         },
         "RTX 4080": {
+            "id": 102,
             "hash_rate": 95,
             "power": 320,
             "price": 1500000,
@@ -27,6 +94,7 @@ class PCPartsData:
             "memory": "16GB GDDR6X"
         },
         "RTX 4070 Ti": {
+            "id": 103,
             "hash_rate": 75,
             "power": 285,
             "price": 1000000,
@@ -36,6 +104,7 @@ class PCPartsData:
             "memory": "12GB GDDR6X"
         },
         "RTX 4070": {
+            "id": 104,
             "hash_rate": 65,
             "power": 200,
             "price": 800000,
@@ -45,6 +114,7 @@ class PCPartsData:
             "memory": "12GB GDDR6X"
         },
         "RTX 4060 Ti": {
+            "id": 105,
             "hash_rate": 50,
             "power": 165,
             "price": 600000,
@@ -54,6 +124,7 @@ class PCPartsData:
             "memory": "8GB GDDR6"
         },
         "RTX 4060": {
+            "id": 106,
             "hash_rate": 40,
             "power": 115,
             "price": 450000,
@@ -65,6 +136,7 @@ class PCPartsData:
         
         # NVIDIA RTX 30シリーズ
         "RTX 3090": {
+            "id": 107,
             "hash_rate": 110,
             "power": 350,
             "price": 1800000,
@@ -74,6 +146,7 @@ class PCPartsData:
             "memory": "24GB GDDR6X"
         },
         "RTX 3080": {
+            "id": 108,
             "hash_rate": 85,
             "power": 320,
             "price": 1200000,
@@ -83,6 +156,7 @@ class PCPartsData:
             "memory": "10GB GDDR6X"
         },
         "RTX 3070": {
+            "id": 109,
             "hash_rate": 70,
             "power": 220,
             "price": 800000,
@@ -92,6 +166,7 @@ class PCPartsData:
             "memory": "8GB GDDR6"
         },
         "RTX 3060 Ti": {
+            "id": 110,
             "hash_rate": 60,
             "power": 200,
             "price": 600000,
@@ -101,6 +176,7 @@ class PCPartsData:
             "memory": "8GB GDDR6"
         },
         "RTX 3060": {
+            "id": 111,
             "hash_rate": 45,
             "power": 170,
             "price": 500000,
@@ -112,6 +188,7 @@ class PCPartsData:
         
         # AMD RX 7000シリーズ
         "RX 7900 XTX": {
+            "id": 112,
             "hash_rate": 105,
             "power": 355,
             "price": 1600000,
@@ -121,6 +198,7 @@ class PCPartsData:
             "memory": "24GB GDDR6"
         },
         "RX 7900 XT": {
+            "id": 113,
             "hash_rate": 90,
             "power": 300,
             "price": 1300000,
@@ -130,6 +208,7 @@ class PCPartsData:
             "memory": "20GB GDDR6"
         },
         "RX 7800 XT": {
+            "id": 114,
             "hash_rate": 75,
             "power": 263,
             "price": 900000,
@@ -139,6 +218,7 @@ class PCPartsData:
             "memory": "16GB GDDR6"
         },
         "RX 7700 XT": {
+            "id": 115,
             "hash_rate": 60,
             "power": 245,
             "price": 700000,
@@ -148,6 +228,7 @@ class PCPartsData:
             "memory": "12GB GDDR6"
         },
         "RX 7600": {
+            "id": 116,
             "hash_rate": 45,
             "power": 165,
             "price": 450000,
@@ -159,6 +240,7 @@ class PCPartsData:
         
         # 旧世代・エントリー
         "GTX 1660 Super": {
+            "id": 117,
             "hash_rate": 30,
             "power": 125,
             "price": 300000,
@@ -168,6 +250,7 @@ class PCPartsData:
             "memory": "6GB GDDR6"
         },
         "GTX 1650": {
+            "id": 118,
             "hash_rate": 18,
             "power": 75,
             "price": 200000,
@@ -182,6 +265,7 @@ class PCPartsData:
     CPUS = {
         # Intel 13世代
         "i9-13900K": {
+            "id": 201,
             "hash_rate": 25,
             "power": 125,
             "price": 800000,
@@ -191,6 +275,7 @@ class PCPartsData:
             "cores": "24コア32スレッド"
         },
         "i7-13700K": {
+            "id": 202,
             "hash_rate": 20,
             "power": 125,
             "price": 600000,
@@ -200,6 +285,7 @@ class PCPartsData:
             "cores": "16コア24スレッド"
         },
         "i5-13600K": {
+            "id": 203,
             "hash_rate": 15,
             "power": 125,
             "price": 450000,
@@ -211,6 +297,7 @@ class PCPartsData:
         
         # AMD Ryzen 7000
         "Ryzen 9 7950X": {
+            "id": 204,
             "hash_rate": 28,
             "power": 170,
             "price": 900000,
@@ -220,6 +307,7 @@ class PCPartsData:
             "cores": "16コア32スレッド"
         },
         "Ryzen 7 7700X": {
+            "id": 205,
             "hash_rate": 22,
             "power": 105,
             "price": 550000,
@@ -229,6 +317,7 @@ class PCPartsData:
             "cores": "8コア16スレッド"
         },
         "Ryzen 5 7600X": {
+            "id": 206,
             "hash_rate": 18,
             "power": 105,
             "price": 400000,
@@ -242,6 +331,7 @@ class PCPartsData:
     # マザーボード
     MOTHERBOARDS = {
         "ASUS ROG MAXIMUS Z790 HERO": {
+            "id": 301,
             "max_gpus": 4,
             "price": 800000,
             "tier": "legendary",
@@ -250,6 +340,7 @@ class PCPartsData:
             "features": ["Wi-Fi 6E", "10Gb LAN", "PCIe 5.0"]
         },
         "MSI MAG B650 TOMAHAWK": {
+            "id": 302,
             "max_gpus": 3,
             "price": 350000,
             "tier": "rare",
@@ -258,6 +349,7 @@ class PCPartsData:
             "features": ["Wi-Fi 6", "2.5Gb LAN", "PCIe 4.0"]
         },
         "ASRock B550M PRO4": {
+            "id": 303,
             "max_gpus": 2,
             "price": 150000,
             "tier": "common",
@@ -270,6 +362,7 @@ class PCPartsData:
     # 電源ユニット
     PSUS = {
         "Corsair AX1600i": {
+            "id": 401,
             "wattage": 1600,
             "efficiency": "80+ Titanium",
             "price": 600000,
@@ -277,6 +370,7 @@ class PCPartsData:
             "modular": True
         },
         "Seasonic Focus GX-850": {
+            "id": 402,
             "wattage": 850,
             "efficiency": "80+ Gold",
             "price": 200000,
@@ -284,6 +378,7 @@ class PCPartsData:
             "modular": True
         },
         "EVGA 600 W1": {
+            "id": 403,
             "wattage": 600,
             "efficiency": "80+ White",
             "price": 80000,
@@ -319,23 +414,30 @@ class PCPartsData:
         "legendary": "🟠"
     }
 
+    # パーツタイプ → レア度重み付きの抽選テーブル（モジュール読み込み時に構築）
+    _samplers: Dict[str, AliasSampler] = {}
+    
+    @classmethod
+    def build_samplers(cls):
+        """パーツタイプごとの抽選テーブルを構築（カタログを変更したら呼び直す）"""
+        samplers = {}
+        for part_type in ("gpus", "cpus", "motherboards", "psus"):
+            parts_dict = getattr(cls, part_type.upper())
+            samplers[part_type] = AliasSampler(
+                list(parts_dict.items()),
+                [cls.RARITY_RATES[data["tier"]] for data in parts_dict.values()]
+            )
+        cls._samplers = samplers
+    
     @classmethod
-    def get_random_part(cls, part_type: str) -> Tuple[str, Dict]:
+    def get_random_part(cls, part_type: str, rng: Optional[random.Random] = None) -> Tuple[str, Dict]:
         """指定されたパーツタイプからランダムに選択"""
-        parts_dict = getattr(cls, part_type.upper())
-        
-        # レア度による重み付け抽選
-        weights = []
-        items = []
-        
-        for name, data in parts_dict.items():
-            tier = data["tier"]
-            weight = cls.RARITY_RATES[tier]
-            weights.append(weight)
-            items.append((name, data))
-        
-        selected_item = random.choices(items, weights=weights, k=1)[0]
-        return selected_item[0], selected_item[1]
+        return cls._samplers[part_type.lower()].sample(rng)
+    
+    @classmethod
+    def get_random_parts(cls, part_type: str, k: int, rng: Optional[random.Random] = None) -> List[Tuple[str, Dict]]:
+        """指定されたパーツタイプから k 個ランダムに選択（まとめ買い用）"""
+        return cls._samplers[part_type.lower()].sample_k(k, rng)
     
     @classmethod
     def calculate_total_hash_rate(cls, user_parts: Dict) -> int:
@@ -394,4 +496,94 @@ class PCPartsData:
                 if total_power > psu_wattage * 0.8:  # 80%ルール
                     return False, f"電源容量が不足しています ({total_power}W > {int(psu_wattage * 0.8)}W)"
         
-        return True, "構成は有効です"
\ No newline at end of file
+        return True, "構成は有効です"
+    
+    @classmethod
+    def compile_build(cls, user_parts: Dict) -> CompiledBuild:
+        """PC構成のハッシュレート・消費電力・効率・有効性を1回の走査で計算"""
+        hash_rate = 0
+        power = 0
+        total_gpus = 0
+        
+        # GPU
+        for gpu_name, quantity in user_parts.get("gpus", {}).items():
+            total_gpus += quantity
+            gpu = cls.GPUS.get(gpu_name)
+            if gpu:
+                hash_rate += gpu["hash_rate"] * quantity
+                power += gpu["power"] * quantity
+        
+        # CPU
+        cpu = cls.CPUS.get(user_parts.get("cpu"))
+        if cpu:
+            hash_rate += cpu["hash_rate"]
+            power += cpu["power"]
+        
+        # マイニング効率（消費電力も考慮）
+        efficiency = hash_rate / power if power > 0 else float(hash_rate)
+        
+        # 有効性チェック（is_build_valid と同じ規則）
+        is_valid, message = True, "構成は有効です"
+        mb_name = user_parts.get("motherboard")
+        psu_name = user_parts.get("psu")
+        if "gpus" in user_parts and mb_name in cls.MOTHERBOARDS \
+                and total_gpus > cls.MOTHERBOARDS[mb_name]["max_gpus"]:
+            max_gpus = cls.MOTHERBOARDS[mb_name]["max_gpus"]
+            is_valid, message = False, f"マザーボード {mb_name} は最大{max_gpus}枚のGPUしかサポートしていません"
+        elif psu_name in cls.PSUS and power > cls.PSUS[psu_name]["wattage"] * 0.8:  # 80%ルール
+            psu_wattage = cls.PSUS[psu_name]["wattage"]
+            is_valid, message = False, f"電源容量が不足しています ({power}W > {int(psu_wattage * 0.8)}W)"
+        
+        return CompiledBuild(hash_rate, power, efficiency, is_valid, message)
+
+class PartsCatalog:
+    """固定の整数IDで引けるPCパーツカタログ
+    
+    全パーツを密なインデックスに並べ、パーツIDは array の列で持つ。
+    所持品・構成の保存データはパーツ名ではなくIDを参照し、名前は表示時にだけ引く。
+    """
+    
+    PART_TYPES = ("gpus", "cpus", "motherboards", "psus")
+    # 構成のスロット → パーツの種類
+    SLOT_TYPES = {"gpus": "gpus", "cpu": "cpus", "motherboard": "motherboards", "psu": "psus"}
+    TYPE_SLOTS = {"gpus": "gpus", "cpus": "cpu", "motherboards": "motherboard", "psus": "psu"}
+    
+    def __init__(self, parts_data=PCPartsData):
+        self.names: List[str] = []
+        self.types: List[str] = []
+        self.data: List[Dict] = []
+        self.ids = array('i')
+        # パーツID → インデックス、(種類, 名前) → パーツID
+        self._index: Dict[int, int] = {}
+        self._ids_by_name: Dict[Tuple[str, str], int] = {}
+        
+        for part_type in self.PART_TYPES:
+            for name, data in getattr(parts_data, part_type.upper()).items():
+                part_id = data["id"]
+                if part_id in self._index:
+                    raise ValueError(f"Duplicate part id {part_id}: {name}")
+                self._index[part_id] = len(self.names)
+                self._ids_by_name[(part_type, name)] = part_id
+                self.names.append(name)
+                self.types.append(part_type)
+                self.data.append(data)
+                self.ids.append(part_id)
+    
+    def __len__(self) -> int:
+        return len(self.names)
+    
+    def id_of(self, part_type: str, name: str) -> Optional[int]:
+        """種類と名前からパーツIDを取得"""
+        return self._ids_by_name.get((part_type, name))
+    
+    def get(self, part_id: int) -> Optional[Tuple[str, str, Dict]]:
+        """パーツIDから (種類, 名前, データ) を取得"""
+        index = self._index.get(part_id)
+        if index is None:
+            return None
+        return self.types[index], self.names[index], self.data[index]
+
+PCPartsData.build_samplers()
+
+# グローバルインスタンス
+parts_catalog = PartsCatalog()
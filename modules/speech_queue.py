@@ -0,0 +1,218 @@
+"""
+RTKS Discord Bot - 読み上げキューモジュール
+ギルドごとにメッセージ順を保った読み上げキューと先読み合成
+"""
+
+import discord
+import asyncio
+import logging
+import time
+from collections import deque
+from itertools import islice
+from typing import Dict, Optional
+
+# ログ設定
+speech_logger = logging.getLogger('speech_queue')
+
+class SpeechItem:
+    """読み上げ待ちの1メッセージ"""
+
+    __slots__ = ('text', 'speaker_id', 'speed', 'pitch', 'volume', 'queued_at', 'task')
+
+    def __init__(self, text: str, speaker_id: int, speed: float, pitch: float, volume: float):
+        self.text = text
+        self.speaker_id = speaker_id
+        self.speed = speed
+        self.pitch = pitch
+        self.volume = volume
+        self.queued_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+
+    def cancel(self):
+        """先読み中の合成を取り消す"""
+        if self.task is not None and not self.task.done():
+            self.task.cancel()
+
+class GuildSpeechQueue:
+    """ギルドごとの読み上げキュー
+
+    メッセージを届いた順に再生し、再生中に次の prefetch 件の合成を並行して進める。
+    再生は after コールバックで次へ進むため、再生中の play() 呼び出しで
+    メッセージが失われることはない。
+
+    - max_depth を超えたときは policy に従い、最も古い待ちを捨てる（drop_oldest）か
+      新しいメッセージを捨てる（drop_newest）
+    - max_age 秒以上待ったメッセージは順番が来ても読み上げずに飛ばす
+    - 他の音声（音楽など）の再生中は、その再生元が after コールバックから
+      audio_finished() を呼ぶまで待つ（通知しない再生元のため IDLE_RECHECK 秒ごとに再確認）
+    """
+
+    POLICIES = ('drop_oldest', 'drop_newest')
+    IDLE_RECHECK = 5.0
+
+    def __init__(self, guild: discord.Guild, synthesizer, max_depth: int = 20, prefetch: int = 3,
+                 policy: str = 'drop_oldest', max_age: float = 60.0):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unsupported speech queue policy: {policy}")
+        self.guild = guild
+        self.synthesizer = synthesizer
+        self.max_depth = max_depth
+        self.prefetch = prefetch
+        self.policy = policy
+        self.max_age = max_age
+        self._items: "deque[SpeechItem]" = deque()
+        self._player: Optional[asyncio.Task] = None
+        # このキューが再生中の音源（skip で他の音声を止めないように照合する）
+        self._current_source: Optional[discord.AudioSource] = None
+        self._idle = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # 統計
+        self.played = 0
+        self.dropped = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def enqueue(self, item: SpeechItem) -> bool:
+        """キューに追加（drop_newest で満杯なら False）"""
+        if len(self._items) >= self.max_depth:
+            if self.policy == 'drop_newest':
+                self.dropped += 1
+                return False
+            self._items.popleft().cancel()
+            self.dropped += 1
+
+        self._items.append(item)
+        self._start_prefetch()
+        if self._player is None or self._player.done():
+            self._player = asyncio.create_task(self._play_loop())
+        return True
+
+    def _synthesis(self, item: SpeechItem) -> asyncio.Task:
+        """メッセージの合成タスクを取得（未開始なら開始）"""
+        if item.task is None:
+            item.task = asyncio.create_task(self.synthesizer.prepare_speech(
+                item.text, item.speaker_id, item.speed, item.pitch, item.volume
+            ))
+        return item.task
+
+    def _start_prefetch(self):
+        """先頭から prefetch 件の合成を開始"""
+        for item in islice(self._items, self.prefetch):
+            self._synthesis(item)
+
+    async def _play_loop(self):
+        """キューが空になるまで順番に再生"""
+        loop = self._loop = asyncio.get_running_loop()
+        while self._items:
+            item = self._items.popleft()
+            self._start_prefetch()
+
+            if time.monotonic() - item.queued_at > self.max_age:
+                item.cancel()
+                self.skipped += 1
+                continue
+
+            try:
+                audio = await self._synthesis(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                speech_logger.error(f"読み上げ音声の合成に失敗: {e}")
+                audio = None
+
+            if not audio:
+                self.failed += 1
+                continue
+
+            voice_client = self.guild.voice_client
+            if not voice_client or not voice_client.is_connected():
+                self.clear()
+                return
+
+            # 他の音声（音楽など）の再生が終わるまで待つ
+            while voice_client.is_playing() or voice_client.is_paused():
+                self._idle.clear()
+                try:
+                    await asyncio.wait_for(self._idle.wait(), timeout=self.IDLE_RECHECK)
+                except asyncio.TimeoutError:
+                    pass
+
+            finished = loop.create_future()
+
+            def after(error, finished=finished):
+                # 再生スレッドから呼ばれるため、完了通知はイベントループに渡す
+                if error:
+                    speech_logger.error(f"読み上げ再生エラー: {error}")
+                loop.call_soon_threadsafe(lambda: finished.done() or finished.set_result(None))
+
+            source = self.synthesizer.create_audio_source(audio)
+            try:
+                voice_client.play(source, after=after)
+            except discord.ClientException as e:
+                speech_logger.error(f"読み上げ再生エラー: {e}")
+                self.failed += 1
+                continue
+
+            self._current_source = source
+            try:
+                await finished
+            finally:
+                self._current_source = None
+            self.played += 1
+
+    def is_idle(self) -> bool:
+        """待ちがなく、合成・再生中のメッセージもないか"""
+        return not self._items and (self._player is None or self._player.done())
+
+    def audio_finished(self):
+        """他の音声の再生終了を通知（再生スレッドの after コールバックから呼べる）"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._idle.set)
+
+    def is_speaking(self) -> bool:
+        """このキューの読み上げを再生中か"""
+        voice_client = self.guild.voice_client
+        return (self._current_source is not None and voice_client is not None
+                and voice_client.source is self._current_source)
+
+    def skip(self) -> bool:
+        """再生中のメッセージを飛ばす（音楽など他の音声は止めない）"""
+        if not self.is_speaking():
+            return False
+        self.guild.voice_client.stop()
+        self.skipped += 1
+        return True
+
+    def clear(self) -> int:
+        """待ちを全て破棄（破棄した件数を返す）"""
+        count = len(self._items)
+        while self._items:
+            self._items.popleft().cancel()
+        self.dropped += count
+        return count
+
+    async def close(self):
+        """再生ループを停止"""
+        self.clear()
+        if self._player is not None:
+            self._player.cancel()
+            try:
+                await self._player
+            except asyncio.CancelledError:
+                pass
+            self._player = None
+
+    def get_stats(self) -> Dict:
+        """キューの統計を取得"""
+        return {
+            'depth': len(self._items),
+            'prefetching': sum(1 for item in self._items if item.task is not None),
+            'played': self.played,
+            'dropped': self.dropped,
+            'skipped': self.skipped,
+            'failed': self.failed,
+        }
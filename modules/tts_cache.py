@@ -0,0 +1,180 @@
+"""
+RTKS Discord Bot - 読み上げ音声キャッシュモジュール
+合成済み音声をテキストと音声パラメータのハッシュで保存し、同じ読み上げで VOICEVOX を呼ばない
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional
+
+# ログ設定
+cache_logger = logging.getLogger('tts_cache')
+
+def normalize_text(text: str) -> str:
+    """キャッシュキー用にテキストを正規化（NFKC・前後の空白除去・連続空白の圧縮）"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize('NFKC', text)).strip()
+
+class TTSCache:
+    """コンテンツアドレス方式の読み上げ音声キャッシュ
+
+    キーは (正規化テキスト, 話者ID, 速度, 音高, 音量) の SHA-256。
+    小さな音声はメモリ上のLRUに、すべての音声はディスクに保存し、
+    どちらも上限バイト数を超えたら古いものから削除する。
+    ディスクI/Oはスレッドプールで行い、イベントループを止めない。
+    """
+
+    # 保存する音声形式（形式を変えたら上げて古いキャッシュと区別する）
+    AUDIO_FORMAT = "wav-48000-stereo"
+
+    def __init__(self, directory: str, memory_max_bytes: int = 32 * 1024 * 1024,
+                 memory_item_max_bytes: int = 1024 * 1024, disk_max_bytes: int = 256 * 1024 * 1024):
+        self.directory = directory
+        self.memory_max_bytes = memory_max_bytes
+        self.memory_item_max_bytes = memory_item_max_bytes
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        # キー → ファイルサイズ（古い順）
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_loaded = False
+
+        # 統計
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    @staticmethod
+    def make_key(text: str, speaker_id: int, speed: float = 1.0, pitch: float = 0.0, volume: float = 1.0) -> str:
+        """キャッシュキーを作成（text は normalize_text 済みであること）"""
+        raw = f"{TTSCache.AUDIO_FORMAT}\0{text}\0{speaker_id}\0{speed:.3f}\0{pitch:.3f}\0{volume:.3f}"
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def _load_disk_index(self):
+        """ディスク上のキャッシュを更新日時順に読み込む（スレッドで実行）"""
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith('.wav'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        entries.sort()
+        self._disk = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_bytes = sum(self._disk.values())
+        self._disk_loaded = True
+
+    async def _ensure_disk_index(self):
+        if not self._disk_loaded:
+            await asyncio.get_running_loop().run_in_executor(None, self._load_disk_index)
+
+    def _remember(self, key: str, data: bytes):
+        """小さな音声をメモリLRUに追加"""
+        if len(data) > self.memory_item_max_bytes:
+            return
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _read_file(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _write_file(self, key: str, data: bytes):
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def _remove_files(self, keys):
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """キャッシュから音声を取得（なければ None）"""
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            self.bytes_saved += len(data)
+            return data
+
+        await self._ensure_disk_index()
+        if key in self._disk:
+            data = await asyncio.get_running_loop().run_in_executor(None, self._read_file, key)
+            if data is not None:
+                self._disk.move_to_end(key)
+                self._remember(key, data)
+                self.disk_hits += 1
+                self.bytes_saved += len(data)
+                return data
+            # ファイルが外部から削除されていた
+            self._disk_bytes -= self._disk.pop(key)
+
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, data: bytes):
+        """音声をキャッシュに保存"""
+        self._remember(key, data)
+
+        await self._ensure_disk_index()
+        if key in self._disk:
+            self._disk.move_to_end(key)
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._write_file, key, data)
+        except OSError as e:
+            cache_logger.error(f"音声キャッシュの書き込みに失敗: {e}")
+            return
+
+        self._disk[key] = len(data)
+        self._disk_bytes += len(data)
+
+        evicted = []
+        while self._disk_bytes > self.disk_max_bytes and len(self._disk) > 1:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            evicted.append(old_key)
+        if evicted:
+            await loop.run_in_executor(None, self._remove_files, evicted)
+
+    def get_stats(self) -> Dict:
+        """キャッシュの統計を取得"""
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': round(hits / total * 100, 2) if total else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_entries': len(self._disk),
+            'disk_bytes': self._disk_bytes,
+        }
@@ -6,9 +6,18 @@ RTKS Discord Bot - VOICEVOX音声機能モジュール
 import discord
 from discord.ext import commands
 from discord import app_commands
+import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
+
+from modules.guild_settings import guild_settings_cache
+from modules.speech_queue import GuildSpeechQueue, SpeechItem
+
+try:
+    import config
+except ImportError:
+    config = None
 
 # ログ設定
 voice_logger = logging.getLogger('voice')
@@ -16,20 +25,44 @@ voice_logger = logging.getLogger('voice')
 class VoiceCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        from modules.music import get_voice_synthesizer
+        self.synthesizer = get_voice_synthesizer(bot)
+        self.speech_queues: Dict[int, GuildSpeechQueue] = {}
+        self.speech_queue_config = getattr(config, 'VOICEVOX_CONFIG', {}).get('queue', {})
+
+        # 読み上げ中に届いた同じ話者の連続メッセージを1回の合成にまとめる（window 秒以内、0 で無効）
+        coalesce_config = getattr(config, 'VOICEVOX_CONFIG', {}).get('coalesce', {})
+        self.coalesce_window = coalesce_config.get('window', 0.8)
+        self.coalesce_max_length = coalesce_config.get('max_length', 200)
+        # guild_id → (発言者ID, まとめ中のメッセージ, 送出タイマー)
+        self._pending_speech: Dict[int, Tuple[int, SpeechItem, asyncio.TimerHandle]] = {}
+        self.coalesced_messages = 0
+
+    async def cog_unload(self):
+        """Cog解除時に読み上げキューを停止"""
+        for _, _, handle in self._pending_speech.values():
+            handle.cancel()
+        self._pending_speech.clear()
+        for speech_queue in self.speech_queues.values():
+            await speech_queue.close()
+        self.speech_queues.clear()
+
+    def get_speech_queue(self, guild: discord.Guild) -> GuildSpeechQueue:
+        """サーバー専用の読み上げキューを取得"""
+        if guild.id not in self.speech_queues:
+            self.speech_queues[guild.id] = GuildSpeechQueue(guild, self.synthesizer, **self.speech_queue_config)
+        return self.speech_queues[guild.id]
 
     @app_commands.command(name="voicelist", description="利用可能な音声話者一覧を表示します")
     async def voicelist(self, interaction: discord.Interaction):
         """利用可能な音声話者一覧を表示"""
         try:
             # VOICEVOX接続確認
-            from modules.music import VoiceSynthesizer
-            synthesizer = VoiceSynthesizer()
-            
-            if not await synthesizer.check_voicevox_connection():
+            if not await self.synthesizer.check_voicevox_connection():
                 await interaction.response.send_message("❌ VOICEVOX サーバーに接続できません。", ephemeral=True)
                 return
 
-            speakers = await synthesizer.get_voicevox_speakers()
+            speakers = await self.synthesizer.get_voicevox_speakers()
             if not speakers:
                 await interaction.response.send_message("❌ 話者一覧を取得できませんでした。", ephemeral=True)
                 return
@@ -74,10 +107,7 @@ class VoiceCog(commands.Cog):
     async def voicevox_status(self, interaction: discord.Interaction):
         """VOICEVOX接続状態を確認"""
         try:
-            from modules.music import VoiceSynthesizer
-            synthesizer = VoiceSynthesizer()
-            
-            is_connected = await synthesizer.check_voicevox_connection()
+            is_connected = await self.synthesizer.check_voicevox_connection()
             
             embed = discord.Embed(
                 title="🔊 VOICEVOX 接続状態",
@@ -87,20 +117,53 @@ class VoiceCog(commands.Cog):
             
             if is_connected:
                 embed.add_field(name="状態", value="✅ 接続済み", inline=True)
-                embed.add_field(name="URL", value=synthesizer.voicevox_url, inline=True)
+                embed.add_field(name="URL", value=self.synthesizer.voicevox_url, inline=True)
                 
                 # 話者数を取得
-                speakers = await synthesizer.get_voicevox_speakers()
+                speakers = await self.synthesizer.get_voicevox_speakers()
                 embed.add_field(name="利用可能話者数", value=f"{len(speakers)}人" if speakers else "0人", inline=True)
             else:
                 embed.add_field(name="状態", value="❌ 接続失敗", inline=True)
-                embed.add_field(name="URL", value=synthesizer.voicevox_url, inline=True)
+                embed.add_field(name="URL", value=self.synthesizer.voicevox_url, inline=True)
                 embed.add_field(
                     name="対処法",
                     value="VOICEVOX エンジンが起動しているか確認してください",
                     inline=False
                 )
 
+            cache_stats = self.synthesizer.cache.get_stats()
+            embed.add_field(
+                name="💾 音声キャッシュ",
+                value=(
+                    f"**ヒット率**: {cache_stats['hit_rate']:.1f}%"
+                    f"（メモリ {cache_stats['memory_hits']:,} / ディスク {cache_stats['disk_hits']:,} / ミス {cache_stats['misses']:,}）\n"
+                    f"**削減した転送量**: {cache_stats['bytes_saved'] / 1024:,.0f} KB\n"
+                    f"**保存数**: メモリ {cache_stats['memory_entries']:,}件 / ディスク {cache_stats['disk_entries']:,}件"
+                    f"（{cache_stats['disk_bytes'] / 1024 / 1024:.1f} MB）"
+                ),
+                inline=False
+            )
+
+            query_stats = self.synthesizer.get_query_cache_stats()
+            embed.add_field(
+                name="📝 クエリキャッシュ",
+                value=(
+                    f"**ヒット率**: {query_stats['hit_rate']:.1f}%"
+                    f"（ヒット {query_stats['hits']:,} / ミス {query_stats['misses']:,}）\n"
+                    f"**保存数**: {query_stats['entries']:,}件"
+                ),
+                inline=False
+            )
+
+            embed.add_field(
+                name="🧩 メッセージまとめ",
+                value=(
+                    f"**待ち時間**: {self.coalesce_window:.1f}秒\n"
+                    f"**まとめた件数**: {self.coalesced_messages:,}件"
+                ) if self.coalesce_window > 0 else "無効",
+                inline=False
+            )
+
             await interaction.response.send_message(embed=embed)
 
         except Exception as e:
@@ -123,14 +186,11 @@ class VoiceCog(commands.Cog):
 
             is_enabled = enabled == "true"
             
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                await db.execute('''
-                    INSERT OR REPLACE INTO guild_settings 
-                    (guild_id, auto_read_channel_id, auto_read_enabled) 
-                    VALUES (?, ?, ?)
-                ''', (interaction.guild.id, interaction.channel.id if is_enabled else None, is_enabled))
-                await db.commit()
+            await guild_settings_cache.update(
+                interaction.guild.id,
+                auto_read_channel_id=interaction.channel.id if is_enabled else None,
+                auto_read_enabled=is_enabled
+            )
 
             embed = discord.Embed(
                 title="🗣️ 自動読み上げ設定",
@@ -182,22 +242,17 @@ class VoiceCog(commands.Cog):
                 return
 
             # VOICEVOX接続確認
-            from modules.music import VoiceSynthesizer
-            synthesizer = VoiceSynthesizer()
-            
-            if not await synthesizer.check_voicevox_connection():
+            if not await self.synthesizer.check_voicevox_connection():
                 await interaction.response.send_message("❌ VOICEVOX サーバーに接続できません。", ephemeral=True)
                 return
 
             # データベースに保存
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.writer() as db:
                 await db.execute('''
                     INSERT OR REPLACE INTO user_voice_settings 
                     (guild_id, user_id, speaker_id, speed, pitch, volume)
                     VALUES (?, ?, ?, ?, ?, ?)
                 ''', (interaction.guild.id, interaction.user.id, speaker_id, speed, pitch, volume))
-                await db.commit()
 
             embed = discord.Embed(
                 title="🗣️ 音声設定完了",
@@ -225,8 +280,7 @@ class VoiceCog(commands.Cog):
                 await interaction.response.send_message("❌ データベースが利用できません。", ephemeral=True)
                 return
 
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
+            async with db_manager.reader() as db:
                 cursor = await db.execute('''
                     SELECT speaker_id, speed, pitch, volume 
                     FROM user_voice_settings 
@@ -260,42 +314,41 @@ class VoiceCog(commands.Cog):
             voice_logger.error(f"音声設定確認エラー: {e}")
             await interaction.response.send_message("❌ 音声設定の確認に失敗しました。", ephemeral=True)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """自動読み上げ処理"""
-        if message.author.bot:
+    @app_commands.command(name="skipread", description="読み上げ中のメッセージをスキップします")
+    async def skipread(self, interaction: discord.Interaction):
+        """読み上げ中のメッセージをスキップ"""
+        speech_queue = self.speech_queues.get(interaction.guild.id)
+        if not speech_queue or not speech_queue.skip():
+            await interaction.response.send_message("❌ 読み上げ中のメッセージがありません。", ephemeral=True)
             return
 
-        try:
-            await self._handle_auto_read(message)
-        except Exception as e:
-            voice_logger.error(f"自動読み上げ処理エラー: {e}")
+        await interaction.response.send_message("⏭️ 読み上げをスキップしました。")
+
+    @app_commands.command(name="clearread", description="読み上げ待ちのメッセージをすべて破棄します")
+    async def clearread(self, interaction: discord.Interaction):
+        """読み上げ待ちを破棄"""
+        speech_queue = self.speech_queues.get(interaction.guild.id)
+        count = speech_queue.clear() if speech_queue else 0
+        await interaction.response.send_message(f"🗑️ 読み上げ待ちのメッセージを {count}件 破棄しました。")
+
+    # メッセージイベントは bot.py の MessageRouter から配送される
 
-    async def _handle_auto_read(self, message):
+    @staticmethod
+    def is_auto_read_channel(message, settings: Dict) -> bool:
+        """自動読み上げが有効なチャンネルへのメッセージか"""
+        return settings['auto_read_enabled'] and settings['auto_read_channel_id'] == message.channel.id
+
+    async def _handle_auto_read(self, message, settings: Dict):
         """自動読み上げ処理"""
         try:
             from database import db_manager
-            if not db_manager.is_initialized():
-                return
 
-            # 自動読み上げ設定をチェック
-            import aiosqlite
-            async with aiosqlite.connect(db_manager.db_path) as db:
-                cursor = await db.execute('''
-                    SELECT auto_read_channel_id, auto_read_enabled 
-                    FROM guild_settings 
-                    WHERE guild_id = ? AND auto_read_enabled = 1
-                ''', (message.guild.id,))
-                result = await cursor.fetchone()
-
-                if not result or result[0] != message.channel.id:
-                    return
-
-                # ボイスクライアント確認
-                voice_client = message.guild.voice_client
-                if not voice_client or not voice_client.is_connected():
-                    return
+            # ボイスクライアント確認
+            voice_client = message.guild.voice_client
+            if not voice_client or not voice_client.is_connected():
+                return
 
+            async with db_manager.reader() as db:
                 # ユーザーの音声設定を取得
                 cursor = await db.execute('''
                     SELECT speaker_id, speed, pitch, volume 
@@ -304,29 +357,65 @@ class VoiceCog(commands.Cog):
                 ''', (message.guild.id, message.author.id))
                 voice_settings = await cursor.fetchone()
 
-                # デフォルト設定
-                speaker_id = voice_settings[0] if voice_settings else 3
-                speed = voice_settings[1] if voice_settings else 1.0
-                pitch = voice_settings[2] if voice_settings else 0.0
-                volume = voice_settings[3] if voice_settings else 1.0
+            # デフォルト設定
+            speaker_id = voice_settings[0] if voice_settings else 3
+            speed = voice_settings[1] if voice_settings else 1.0
+            pitch = voice_settings[2] if voice_settings else 0.0
+            volume = voice_settings[3] if voice_settings else 1.0
 
-                # 音声ファイル生成
-                from modules.music import VoiceSynthesizer
-                synthesizer = VoiceSynthesizer()
-                
-                # メッセージをクリーンアップ
-                clean_text = self._clean_message_for_speech(message.content)
-                if not clean_text:
-                    return
+            # メッセージをクリーンアップ
+            clean_text = self._clean_message_for_speech(message.content)
+            if not clean_text:
+                return
 
-                audio_file = await synthesizer.generate_voice_voicevox(clean_text, speaker_id)
-                if audio_file:
-                    # 音声再生
-                    voice_client.play(discord.FFmpegPCMAudio(audio_file))
+            # 読み上げキューに追加（合成は先読みされ、届いた順に再生される）
+            self._queue_speech(message.guild, message.author.id, SpeechItem(clean_text, speaker_id, speed, pitch, volume))
 
         except Exception as e:
             voice_logger.error(f"自動読み上げ処理詳細エラー: {e}")
 
+    def _queue_speech(self, guild: discord.Guild, user_id: int, item: SpeechItem):
+        """同じ話者の連続メッセージをまとめてから読み上げキューに追加
+
+        読み上げキューが空いていればすぐに送り、まとめるのは読み上げ中に届いた分だけ
+        （単発のメッセージに待ち時間を足さない）。
+        まとめ中の枠はギルドに1つだけで、別の話者のメッセージが届いた時点で
+        それまでの分を送るため、読み上げ順は届いた順のまま変わらない。
+        まとめられるのは間に他の発言を挟まない連続メッセージのみ。
+        まとめたテキストは個々のメッセージと異なるため、読み上げ音声キャッシュには当たりにくい。
+        """
+        pending = self._pending_speech.get(guild.id)
+        if self.coalesce_window <= 0 or (pending is None and self.get_speech_queue(guild).is_idle()):
+            self.get_speech_queue(guild).enqueue(item)
+            return
+
+        if pending:
+            pending_user_id, pending_item, _ = pending
+            same_voice = (pending_item.speaker_id, pending_item.speed, pending_item.pitch, pending_item.volume) == \
+                (item.speaker_id, item.speed, item.pitch, item.volume)
+            if pending_user_id == user_id and same_voice \
+                    and len(pending_item.text) + 1 + len(item.text) <= self.coalesce_max_length:
+                pending_item.text = f"{pending_item.text}。{item.text}"
+                self.coalesced_messages += 1
+                return
+            # まとめられない場合はここまでの分を先に送る
+            self._flush_speech(guild.id)
+
+        handle = asyncio.get_running_loop().call_later(self.coalesce_window, self._flush_speech, guild.id)
+        self._pending_speech[guild.id] = (user_id, item, handle)
+
+    def _flush_speech(self, guild_id: int):
+        """まとめ中のメッセージを読み上げキューに送る"""
+        pending = self._pending_speech.pop(guild_id, None)
+        if pending is None:
+            return
+        _, item, handle = pending
+        handle.cancel()
+
+        guild = self.bot.get_guild(guild_id)
+        if guild:
+            self.get_speech_queue(guild).enqueue(item)
+
     def _clean_message_for_speech(self, text: str) -> str:
         """メッセージを読み上げ用にクリーンアップ"""
         import re
@@ -0,0 +1,85 @@
+"""えせ中国語変換器のテスト"""
+
+import json
+import random
+from pathlib import Path
+
+from modules.chinese_converter import ChineseConverter, with_kana_variants
+
+DEFAULT_DICTIONARY = Path(__file__).resolve().parent.parent / "data" / "chinese" / "default.json"
+
+SAMPLE_MAP = {'あ': '阿', 'い': '伊', 'す': '斯', 'ま': '馬', 'で': '得', 'の': '之'}
+
+
+def convert_by_loop(mapping, text):
+    """以前の1文字ずつ連結する実装（比較用）"""
+    result = ""
+    for char in text:
+        result += mapping.get(char, char)
+    return result
+
+
+def test_matches_character_loop():
+    """1文字の変換はデフォルト辞書で以前の実装と同じ結果になる（10,000メッセージ）"""
+    with open(DEFAULT_DICTIONARY, encoding="utf-8") as f:
+        mapping = json.load(f)["entries"]
+    converter = ChineseConverter(mapping)
+
+    rng = random.Random(0)
+    alphabet = list(mapping) + list("漢字テストabc 123!?。")
+    for _ in range(10000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(10, 120)))
+        assert converter.convert(text) == convert_by_loop(mapping, text)
+
+
+def test_phrases_prefer_longest_match():
+    converter = ChineseConverter({**SAMPLE_MAP, 'です': '是', 'ですの': '是之也'})
+    assert converter.convert("あですのい") == "阿是之也伊"
+    assert converter.convert("あですい") == "阿是伊"
+    assert converter.convert("ですですの") == "是是之也"
+
+
+def convert_by_replace(mapping, text):
+    """語句を長い順に str.replace してから1文字ずつ置換する基準実装（比較用）"""
+    phrases = sorted((source for source in mapping if len(source) > 1), key=len, reverse=True)
+    for phrase in phrases:
+        text = text.replace(phrase, mapping[phrase])
+    return convert_by_loop(mapping, text)
+
+
+def test_default_dictionary_matches_replace_loop():
+    """語句を含むデフォルト辞書の変換結果が str.replace による基準実装と一致する"""
+    with open(DEFAULT_DICTIONARY, encoding="utf-8") as f:
+        data = json.load(f)
+    mapping = with_kana_variants({**data["entries"], **data["phrases"]})
+    converter = ChineseConverter(mapping)
+
+    rng = random.Random(1)
+    pieces = list(mapping) + list(data["phrases"]) * 10 + list("漢字abc 123!?。")
+    for _ in range(10000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(5, 60)))
+        assert converter.convert(text) == convert_by_replace(mapping, text)
+
+
+def test_kana_variants():
+    """ひらがなのエントリはカタカナにも適用され、カタカナ側の定義が優先される"""
+    converter = ChineseConverter(with_kana_variants({**SAMPLE_MAP, 'ア': '亜'}))
+    assert converter.convert("アイ") == "亜伊"
+    assert converter.convert("あい") == "阿伊"
+
+
+def test_kana_variants_do_not_add_hiragana():
+    """カタカナだけのエントリ（ッャュョ）から小書きのひらがなは追加されない"""
+    expanded = with_kana_variants({'ッ': '津', 'ャ': '也'})
+    assert expanded == {'ッ': '津', 'ャ': '也'}
+    assert ChineseConverter(expanded).convert("ッっャゃ") == "津っ也ゃ"
+
+
+def test_registry_get_does_not_load_files(tmp_path):
+    """get() はファイルを読まず、reload() 後に辞書を返す"""
+    from modules.chinese_converter import ChineseDictionaryRegistry
+
+    registry = ChineseDictionaryRegistry(DEFAULT_DICTIONARY.parent)
+    assert registry.get() is None
+    assert registry.reload() == 1
+    assert registry.get("unknown") is registry.get()
@@ -0,0 +1,134 @@
+"""DatabaseManager の書き込みキューのテスト"""
+
+import asyncio
+import sqlite3
+
+import pytest
+import pytest_asyncio
+
+from database import DatabaseManager
+
+
+@pytest_asyncio.fixture
+async def manager(tmp_path):
+    manager = DatabaseManager(db_path=str(tmp_path / "test.db"))
+    await manager.initialize()
+    yield manager
+    await asyncio.wait_for(manager.close(), timeout=2)
+
+
+@pytest.mark.asyncio
+async def test_writer_cancelled_after_connection_handed_over(manager):
+    """ジョブがコネクションを渡した直後に呼び出し側がキャンセルされても書き込みキューが止まらない"""
+    entered = False
+
+    async def caller():
+        nonlocal entered
+        async with manager.writer() as db:
+            entered = True
+            await db.execute("INSERT INTO allowed_users (user_id) VALUES (1)")
+
+    task = None
+    submit_write = manager.submit_write
+
+    def cancel_after_handover(job):
+        async def wrapped(db):
+            inner = asyncio.ensure_future(job(db))
+            # ジョブが ready を設定して done を待ち始めたところで呼び出し側をキャンセル
+            await asyncio.sleep(0)
+            task.cancel()
+            return await inner
+
+        return submit_write(wrapped)
+
+    manager.submit_write = cancel_after_handover
+    task = asyncio.create_task(caller())
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    manager.submit_write = submit_write
+
+    assert not entered
+    # 後続の書き込みが処理される
+    await asyncio.wait_for(manager.execute_write("INSERT INTO allowed_users (user_id) VALUES (2)"), timeout=2)
+
+    async with manager.reader() as db:
+        cursor = await db.execute("SELECT user_id FROM allowed_users ORDER BY user_id")
+        rows = await cursor.fetchall()
+    assert rows == [(2,)]
+
+
+def test_failed_migration_stops_startup(tmp_path, monkeypatch):
+    """マイグレーションに失敗したら古いスキーマのまま起動しない"""
+    def broken_migration(cursor):
+        raise sqlite3.OperationalError("broken migration")
+
+    migrations = DatabaseManager._migrations
+    monkeypatch.setattr(
+        DatabaseManager, "_migrations",
+        lambda self: migrations(self) + [(999, "broken", broken_migration)]
+    )
+    with pytest.raises(sqlite3.OperationalError):
+        DatabaseManager(db_path=str(tmp_path / "test.db"))
+
+    # 失敗したマイグレーションは1つも適用されていない
+    conn = sqlite3.connect(str(tmp_path / "test.db"))
+    try:
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'schema_version'").fetchone() is None
+    finally:
+        conn.close()
+
+
+def test_pc_build_migrations_match_current_catalog(tmp_path, monkeypatch):
+    """固定値で持つ移行時のカタログが現行の compile_build / パーツIDと一致する"""
+    import json
+
+    from modules.pc_parts import PCPartsData, parts_catalog
+
+    db_path = str(tmp_path / "test.db")
+    builds = {
+        1: {"gpus": {"RTX 4090": 2, "RX 7600": 1}, "cpu": "Ryzen 9 7950X",
+            "motherboard": "MSI MAG B650 TOMAHAWK", "psu": "Corsair AX1600i"},
+        2: {"gpus": {"RTX 3060": 3}, "motherboard": "ASRock B550M PRO4"},
+        3: {"gpus": {"RTX 4080": 2}, "cpu": "i9-13900K", "psu": "EVGA 600 W1"},
+        4: {"cpu": "i5-13600K"},
+    }
+
+    # JSONで構成を保存していたバージョン4のデータベースを用意
+    migrations = DatabaseManager._migrations
+    monkeypatch.setattr(DatabaseManager, "_migrations", lambda self: migrations(self)[:4])
+    DatabaseManager(db_path=db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executemany(
+            "INSERT INTO user_economy (guild_id, user_id, pc_parts) VALUES (1, ?, ?)",
+            [(user_id, json.dumps(build)) for user_id, build in builds.items()]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    monkeypatch.setattr(DatabaseManager, "_migrations", migrations)
+    DatabaseManager(db_path=db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        stats = {
+            row[0]: tuple(row[1:])
+            for row in conn.execute(
+                "SELECT user_id, hash_rate, power, efficiency, is_valid, message FROM user_pc_build_stats"
+            )
+        }
+        parts = conn.execute(
+            "SELECT user_id, part_id, quantity FROM user_pc_build_parts ORDER BY user_id, part_id"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    assert stats == {user_id: tuple(PCPartsData.compile_build(build)) for user_id, build in builds.items()}
+
+    expected_parts = []
+    for user_id, build in builds.items():
+        for slot, value in build.items():
+            part_type = parts_catalog.SLOT_TYPES[slot]
+            for name, quantity in (value.items() if isinstance(value, dict) else [(value, 1)]):
+                expected_parts.append((user_id, parts_catalog.id_of(part_type, name), quantity))
+    assert parts == sorted(expected_parts)
@@ -0,0 +1,61 @@
+"""経済システムの残高更新のテスト"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+import economy
+from database import DatabaseManager
+from economy import EconomySystem
+
+GUILD_ID = 1
+USER_ID = 2
+
+
+@pytest_asyncio.fixture
+async def economy_system(tmp_path, monkeypatch):
+    manager = DatabaseManager(db_path=str(tmp_path / "test.db"))
+    await manager.initialize()
+    monkeypatch.setattr(economy, "db_manager", manager)
+    yield EconomySystem()
+    await asyncio.wait_for(manager.close(), timeout=5)
+
+
+async def transaction_count(system):
+    async with economy.db_manager.reader() as db:
+        cursor = await db.execute(
+            "SELECT COUNT(*) FROM economy_transactions WHERE guild_id = ? AND user_id = ?",
+            (GUILD_ID, USER_ID)
+        )
+        return (await cursor.fetchone())[0]
+
+
+@pytest.mark.asyncio
+async def test_parallel_balance_updates_lose_nothing(economy_system):
+    """1,000件の並列更新で更新が失われず、残高が負にならない"""
+    start = await economy_system.get_user_balance(GUILD_ID, USER_ID)
+
+    # 加算は全て受理される
+    results = await asyncio.gather(*[
+        economy_system.update_balance(GUILD_ID, USER_ID, 1, "test", "credit")
+        for _ in range(1000)
+    ])
+    assert all(success for success, _ in results)
+    assert await economy_system.get_user_balance(GUILD_ID, USER_ID) == start + 1000
+
+    # 残高 2,000 から 5 ずつ 1,000件引くと、ちょうど400件だけ受理される
+    results = await asyncio.gather(*[
+        economy_system.update_balance(GUILD_ID, USER_ID, -5, "test", "debit")
+        for _ in range(1000)
+    ])
+    accepted = [balance for success, balance in results if success]
+    rejected = [message for success, message in results if not success]
+    assert len(accepted) == (start + 1000) // 5
+    assert len(rejected) == 1000 - len(accepted)
+    assert all(message == "残高不足です" for message in rejected)
+    assert min(accepted) >= 0
+    assert await economy_system.get_user_balance(GUILD_ID, USER_ID) == (start + 1000) % 5
+
+    # 取引記録は受理された更新の分だけ
+    assert await transaction_count(economy_system) == 1000 + len(accepted)
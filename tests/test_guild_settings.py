@@ -0,0 +1,58 @@
+"""ギルド設定キャッシュのテスト"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from database import DatabaseManager
+from modules import guild_settings
+from modules.guild_settings import GlobalChatIndex, GuildSettingsCache
+
+GUILD_ID = 1
+CHANNEL_ID = 100
+
+
+@pytest_asyncio.fixture
+async def cache(tmp_path, monkeypatch):
+    manager = DatabaseManager(db_path=str(tmp_path / "test.db"))
+    await manager.initialize()
+    monkeypatch.setattr(guild_settings, "db_manager", manager)
+    monkeypatch.setattr(guild_settings, "global_chat_index", GlobalChatIndex())
+    yield GuildSettingsCache()
+    await asyncio.wait_for(manager.close(), timeout=5)
+
+
+@pytest.mark.asyncio
+async def test_update_keeps_global_chat_index_in_sync(cache):
+    """読み込み前でも update() でグローバルチャットのインデックスが更新される"""
+    index = guild_settings.global_chat_index
+    assert not cache.is_loaded()
+
+    await cache.update(GUILD_ID, global_chat_channel_id=CHANNEL_ID)
+    assert index.guild_for(CHANNEL_ID) == GUILD_ID
+
+    # 他の設定の更新ではインデックスは変わらない
+    await cache.update(GUILD_ID, auto_read_enabled=True)
+    assert index.channel_for(GUILD_ID) == CHANNEL_ID
+
+    await cache.update(GUILD_ID, global_chat_channel_id=None)
+    assert index.guild_for(CHANNEL_ID) is None
+    assert len(index) == 0
+
+
+@pytest.mark.asyncio
+async def test_callers_cannot_mutate_cached_settings(cache):
+    """get() は読み取り専用、peek() と all() はコピーを返す"""
+    await cache.update(GUILD_ID, auto_read_enabled=True)
+    await cache.load()
+
+    for guild_id in (GUILD_ID, 2):
+        settings = await cache.get(guild_id)
+        with pytest.raises(TypeError):
+            settings['auto_read_enabled'] = False
+
+    cache.peek(GUILD_ID)['auto_read_enabled'] = False
+    cache.all()[GUILD_ID]['auto_read_enabled'] = False
+    assert (await cache.get(GUILD_ID))['auto_read_enabled'] is True
+    assert (await cache.get(2))['auto_read_enabled'] is False
@@ -0,0 +1,63 @@
+"""PCパーツ抽選テーブルのテスト"""
+
+import random
+from collections import Counter
+
+import pytest
+
+from modules.pc_parts import AliasSampler, PCPartsData
+
+
+def test_same_seed_gives_same_sequence():
+    """同じシードなら sample / sample_k の結果が一致する"""
+    sampler = AliasSampler(["a", "b", "c", "d"], [50.0, 30.0, 15.0, 5.0])
+
+    first = [sampler.sample(random.Random(42)) for _ in range(5)]
+    assert first == [sampler.sample(random.Random(42)) for _ in range(5)]
+    assert sampler.sample_k(1000, random.Random(7)) == sampler.sample_k(1000, random.Random(7))
+
+    rng = random.Random(7)
+    assert [sampler.sample(rng) for _ in range(1000)] == sampler.sample_k(1000, random.Random(7))
+
+
+def test_frequencies_follow_weights():
+    """抽選頻度が重みの比率と許容誤差内で一致する"""
+    for part_type in ("gpus", "cpus", "motherboards", "psus"):
+        parts = getattr(PCPartsData, part_type.upper())
+        weights = {name: PCPartsData.RARITY_RATES[data["tier"]] for name, data in parts.items()}
+        total = sum(weights.values())
+
+        draws = 200_000
+        counts = Counter(
+            name for name, _ in PCPartsData.get_random_parts(part_type, draws, random.Random(part_type))
+        )
+        for name, weight in weights.items():
+            expected = weight / total
+            assert abs(counts[name] / draws - expected) < 0.005, (part_type, name)
+
+
+def test_zero_weight_items_are_never_drawn():
+    """重み0の要素は抽選されない"""
+    sampler = AliasSampler(["never", "a", "b", "never too"], [0, 1, 3, 0])
+    counts = Counter(sampler.sample_k(100_000, random.Random(1)))
+    assert set(counts) == {"a", "b"}
+    assert abs(counts["b"] / 100_000 - 0.75) < 0.01
+
+
+def test_single_item():
+    """要素が1つなら常にその要素"""
+    sampler = AliasSampler(["only"], [3.0])
+    assert sampler.sample(random.Random(0)) == "only"
+    assert sampler.sample_k(10, random.Random(0)) == ["only"] * 10
+
+
+@pytest.mark.parametrize("items, weights", [
+    ([], []),
+    (["a", "b"], [1.0]),
+    (["a", "b"], [0, 0]),
+    (["a", "b"], [-1.0, 2.0]),
+])
+def test_invalid_inputs(items, weights):
+    """空・長さ不一致・重みの合計が0・負の重みは ValueError"""
+    with pytest.raises(ValueError):
+        AliasSampler(items, weights)
@@ -0,0 +1,18 @@
+"""ホットパスのクエリがインデックスを使っているかのテスト"""
+
+import sqlite3
+
+from database import DatabaseManager
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    """新規にマイグレーションしたデータベースで HOT_QUERIES が想定のインデックスを使う"""
+    db_path = str(tmp_path / "test.db")
+    manager = DatabaseManager(db_path=db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert manager.get_schema_version(conn.cursor()) == max(m[0] for m in manager._migrations())
+        assert manager.check_query_plans(conn) == []
+    finally:
+        conn.close()
@@ -0,0 +1,134 @@
+"""読み上げキューのテスト"""
+
+import asyncio
+import threading
+
+import pytest
+
+from modules.speech_queue import GuildSpeechQueue, SpeechItem
+
+
+class FakeVoiceClient:
+    """再生を手動で終了させられる VoiceClient の代わり"""
+
+    def __init__(self):
+        self.source = None
+        self.played = []
+        self.stopped = 0
+        self._after = None
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self.source is not None
+
+    def is_paused(self):
+        return False
+
+    def play(self, source, after=None):
+        self.source = source
+        self.played.append(source)
+        self._after = after
+
+    def finish(self):
+        """再生スレッドから after を呼ぶ"""
+        after, self._after, self.source = self._after, None, None
+        if after is not None:
+            thread = threading.Thread(target=after, args=(None,))
+            thread.start()
+            thread.join()
+
+    def stop(self):
+        self.stopped += 1
+        self.finish()
+
+
+class FakeGuild:
+    def __init__(self):
+        self.voice_client = FakeVoiceClient()
+
+
+class FakeSynthesizer:
+    async def prepare_speech(self, text, speaker_id, speed, pitch, volume):
+        return text.encode()
+
+    def create_audio_source(self, audio):
+        return ("speech", audio)
+
+
+def speech(text):
+    return SpeechItem(text, 1, 1.0, 0.0, 1.0)
+
+
+async def wait_until(predicate):
+    for _ in range(100):
+        if predicate():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not reached")
+
+
+@pytest.mark.asyncio
+async def test_waits_for_other_audio_until_notified():
+    """他の音声の再生中は audio_finished() の通知で読み上げを始める"""
+    guild = FakeGuild()
+    voice_client = guild.voice_client
+    queue = GuildSpeechQueue(guild, FakeSynthesizer())
+    queue.IDLE_RECHECK = 60.0
+    voice_client.play("music")
+
+    queue.enqueue(speech("a"))
+    await asyncio.sleep(0.05)
+    assert voice_client.played == ["music"]
+
+    voice_client.finish()
+    queue.audio_finished()
+    await wait_until(lambda: len(voice_client.played) == 2)
+    assert voice_client.played[1] == ("speech", b"a")
+
+    voice_client.finish()
+    await wait_until(lambda: queue.played == 1)
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_skip_does_not_stop_other_audio():
+    """/skipread は自分の読み上げだけを止める"""
+    guild = FakeGuild()
+    voice_client = guild.voice_client
+    queue = GuildSpeechQueue(guild, FakeSynthesizer())
+
+    voice_client.play("music")
+    assert not queue.skip()
+    assert voice_client.stopped == 0
+    voice_client.finish()
+
+    queue.enqueue(speech("a"))
+    queue.enqueue(speech("b"))
+    await wait_until(lambda: queue.is_speaking())
+    assert queue.skip()
+    assert voice_client.stopped == 1
+    await wait_until(lambda: voice_client.played[-1] == ("speech", b"b"))
+
+    voice_client.finish()
+    await wait_until(lambda: queue.played == 2)
+    assert queue.skipped == 1
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_is_idle_until_last_clip_finishes():
+    """待ちと再生がなくなるまで is_idle() は偽"""
+    guild = FakeGuild()
+    queue = GuildSpeechQueue(guild, FakeSynthesizer())
+    assert queue.is_idle()
+
+    queue.enqueue(speech("a"))
+    assert not queue.is_idle()
+    await wait_until(lambda: queue.is_speaking())
+    assert not queue.is_idle()
+
+    guild.voice_client.finish()
+    await wait_until(queue.is_idle)
+    await queue.close()